@@ -1,11 +1,32 @@
 #!/usr/bin/env python
 import os
 import sys
+import io
+import argparse
+import contextlib
 import time
 import shutil
 import select
 import difflib
 import re
+import json
+import hashlib
+import zlib
+import zipfile
+import errno
+import mmap
+import array
+import struct
+import xml.etree.ElementTree as ElementTree
+import ftplib
+import posixpath
+import queue
+import threading
+import cProfile
+import functools
+import multiprocessing
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 
 
@@ -13,9 +34,50 @@ import re
 if sys.platform.startswith("win"):
     import msvcrt
 
+# POSIX-only: fcntl provides the FICLONE ioctl used for reflinks.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# POSIX-only: the forkserver starts worker processes safely while other threads are running.
+try:
+    from multiprocessing import forkserver
+except ImportError:
+    forkserver = None
+
+# Optional: Pillow resizes and recompresses cover art (pip install Pillow).
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Optional: py7zr lists and extracts .7z archives (pip install py7zr); .zip needs nothing extra.
+try:
+    import py7zr
+except ImportError:
+    py7zr = None
+
 # Set base directory and master configuration file.
 BASE_DIR = os.getcwd()
-MASTER_CONFIG = os.path.join(BASE_DIR, "master.txt")
+MASTER_CONFIG = os.path.join(BASE_DIR, "Master.txt")
+
+# False when running from the command line (batch mode): no sleeps, no prompts.
+INTERACTIVE = True
+
+class NonInteractiveError(RuntimeError):
+    """Raised when an operation needs an answer that batch mode didn't provide."""
+
+def ask(prompt):
+    """input() for the menus; fails instead of blocking when running in batch mode."""
+    if not INTERACTIVE:
+        raise NonInteractiveError(f"Needs an answer in batch mode: {prompt.strip()}")
+    return input(prompt)
+
+def pause(seconds):
+    """Lets the user read the last message in the menus; skipped in batch mode and in pipeline stages."""
+    if INTERACTIVE and threading.current_thread() is threading.main_thread():
+        time.sleep(seconds)
 
 # -----------------------------
 # Helper: Pause or Continue
@@ -43,26 +105,579 @@ def pause_or_continue(timeout=20):
     print("\nReturning to target system selection...\n")
 
 # -----------------------------
-# Helper: Get Expected Systems
+# Instrumentation
 # -----------------------------
-def get_expected_systems():
-    expected = set()
-    if not os.path.exists(MASTER_CONFIG):
-        return expected
-    with open(MASTER_CONFIG, "r", encoding="utf-8") as f:
-        for line in f:
+# Print a line for every file, like older versions (otherwise a progress bar and a summary).
+VERBOSE = False
+# Add the time of each phase and the match similarity chart to the summary (always on with VERBOSE).
+SHOW_STATS = False
+# Per-file detail is written here when set: a ".jsonl" path gets one JSON object per line,
+# anything else a plain text log.
+TRACE_PATH = None
+# When set, every operation runs under cProfile and its stats are saved in this folder.
+PROFILE_DIR = None
+PROGRESS_INTERVAL = 0.25
+PROGRESS_WIDTH = 30
+RATIO_BUCKETS = 10
+
+class OperationStats:
+    """
+    Timers, counters and the per-file trace of one operation. Phase times add
+    up across calls, so a phase entered once per system reports the total.
+    Safe to use from the copy and delete threads.
+    """
+
+    def __init__(self, op):
+        self.op = op
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.phases = {}
+        self.counters = {}
+        self.histogram = [0] * RATIO_BUCKETS
+        self.lock = threading.Lock()
+        self.trace = None
+        self.trace_json = False
+        self.last_progress = 0.0
+        self.progress_shown = False
+
+    def open_trace(self, path):
+        if path:
+            self.trace = open(path, "a", encoding="utf-8")
+            self.trace_json = path.lower().endswith(".jsonl")
+
+    def close(self):
+        self.seconds = time.perf_counter() - self.started
+        self.end_progress()
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def ratio(self, value):
+        bucket = min(RATIO_BUCKETS - 1, max(0, int(value * RATIO_BUCKETS)))
+        with self.lock:
+            self.histogram[bucket] += 1
+
+    def detail(self, message, event=None, **fields):
+        """One per-file message: printed only when VERBOSE, always written to the trace."""
+        with self.lock:
+            if VERBOSE:
+                self._clear_progress()
+                print(message)
+            if self.trace is None:
+                return
+            if self.trace_json:
+                record = {"t": round(time.perf_counter() - self.started, 4), "op": self.op, "event": event}
+                record.update(fields)
+                record["message"] = message
+                self.trace.write(json.dumps(record, ensure_ascii=False) + "\n")
+            else:
+                self.trace.write(f"{time.strftime('%H:%M:%S')} [{self.op}] {message}\n")
+
+    def progress(self, done, total, label=""):
+        """Redraws the progress bar at most every PROGRESS_INTERVAL seconds (terminals only)."""
+        if VERBOSE or not total or not sys.stdout.isatty():
+            return
+        now = time.perf_counter()
+        with self.lock:
+            if now - self.last_progress < PROGRESS_INTERVAL and done < total:
+                return
+            self.last_progress = now
+            filled = PROGRESS_WIDTH * done // total
+            bar = "█" * filled + "░" * (PROGRESS_WIDTH - filled)
+            print(f"\r{bar} {done * 100 // total:3d}% {done}/{total} {label}", end="", flush=True)
+            self.progress_shown = True
+
+    def _clear_progress(self):
+        if self.progress_shown:
+            print()
+            self.progress_shown = False
+
+    def end_progress(self):
+        with self.lock:
+            self._clear_progress()
+
+    def as_dict(self):
+        data = {"op": self.op, "seconds": round(self.seconds or 0.0, 4),
+                "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+                "counters": dict(self.counters)}
+        if any(self.histogram):
+            data["match_ratio_histogram"] = list(self.histogram)
+        return data
+
+    def summary(self):
+        if not self.phases and not self.counters:
+            return
+        detailed = VERBOSE or SHOW_STATS
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        print(f"\n⏱ {self.op} took {self.seconds:.2f}s" + (f" ({phases})" if phases and detailed else ""))
+        if self.counters:
+            print("   " + ", ".join(format_bytes(value) if name == "bytes" else f"{value} {name}"
+                                   for name, value in self.counters.items()))
+        if detailed and any(self.histogram):
+            print("   Match similarity:")
+            most = max(self.histogram)
+            for bucket, amount in enumerate(self.histogram):
+                low = bucket / RATIO_BUCKETS
+                bar = "█" * (amount * PROGRESS_WIDTH // most) if amount else ""
+                print(f"   {low:.1f}-{low + 1 / RATIO_BUCKETS:.1f} {amount:6d} {bar}")
+
+_current_stats = None
+_last_stats = None
+
+def current_stats():
+    """The running operation's stats (a throwaway one outside of an operation)."""
+    return _current_stats if _current_stats is not None else OperationStats(None)
+
+def last_operation_stats():
+    return _last_stats
+
+def instrumented(op):
+    """
+    Decorator for the operations: times them, opens the trace, optionally runs
+    them under cProfile and prints the summary. An operation started from
+    inside another one (ie. resuming a journal) shares the outer stats.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            global _current_stats, _last_stats
+            if _current_stats is not None:
+                return func(*args, **kwargs)
+            stats = OperationStats(op)
+            stats.open_trace(TRACE_PATH)
+            profiler = cProfile.Profile() if PROFILE_DIR else None
+            _current_stats = stats
+            try:
+                if profiler is not None:
+                    return profiler.runcall(func, *args, **kwargs)
+                return func(*args, **kwargs)
+            finally:
+                _current_stats = None
+                _last_stats = stats
+                stats.close()
+                stats.summary()
+                if profiler is not None:
+                    os.makedirs(PROFILE_DIR, exist_ok=True)
+                    path = os.path.join(PROFILE_DIR, f"{op} {time.strftime('%Y%m%d-%H%M%S')}.prof")
+                    profiler.dump_stats(path)
+                    print(f"Profile saved to {path} (open with python -m pstats)")
+        return wrapper
+    return decorate
+
+# -----------------------------
+# Master.txt Config
+# -----------------------------
+class MasterConfig:
+    """
+    Parsed, read-only view of Master.txt.
+
+    sections   - tuple of (aliases, settings) in file order; settings keep the raw
+                 "drive:" templates and the last value wins for repeated keys
+    aliases    - alias -> settings of the section it belongs to
+    working_folders - target -> folder from the [Working Folder] section
+    m3u        - alias -> "m3u" key, for systems that have one
+    region_rules - (folder, tags) pairs from [Region Sort], in priority order
+    """
+
+    def __init__(self, sections=(), working_folders=None, region_rules=None):
+        self.sections = tuple(sections)
+        aliases = {}
+        for names, settings in self.sections:
+            for alias in names:
+                aliases[alias] = settings
+        self.aliases = MappingProxyType(aliases)
+        self.working_folders = MappingProxyType(dict(working_folders or {}))
+        self.m3u = MappingProxyType({alias: settings["m3u"] for alias, settings in aliases.items() if "m3u" in settings})
+        self.expected_systems = frozenset(aliases)
+        if region_rules is None:
+            region_rules = DEFAULT_REGION_RULES
+        self.region_rules = tuple((folder, tuple(tags)) for folder, tags in region_rules)
+        self._drive_views = {}
+        self._region_classifier = None
+
+    @classmethod
+    def parse(cls, lines):
+        sections = []
+        working_folders = {}
+        region_rules = {}
+        current = None
+        for line in lines:
             line = line.strip()
             if not line:
                 continue
             if line.startswith("[") and line.endswith("]"):
                 header = line[1:-1].strip()
-                if header == "Working Folder":  # compare case-sensitively
+                if header.lower() == "working folder":
+                    current = working_folders
+                    continue
+                if header.lower() == "region sort":
+                    current = region_rules
                     continue
                 # Store aliases as they appear, without lower-casing.
-                aliases = [alias.strip() for alias in header.split("|")]
-                for alias in aliases:
-                    expected.add(alias)
-    return expected
+                names = tuple(alias.strip() for alias in header.split("|"))
+                current = {}
+                sections.append((names, current))
+            elif current is not None and line.startswith("-"):
+                parts = line[1:].split("=", 1)
+                if len(parts) == 2:
+                    current[parts[0].strip()] = parts[1].strip()  # Preserve case
+        rules = [(folder, [tag.strip() for tag in tags.split(",") if tag.strip()]) for folder, tags in region_rules.items()]
+        return cls([(names, MappingProxyType(settings)) for names, settings in sections], working_folders,
+                   rules or None)
+
+    def region_classifier(self):
+        if self._region_classifier is None:
+            self._region_classifier = RegionClassifier(self.region_rules)
+        return self._region_classifier
+
+    def working_folder(self, target_system, default="Systems"):
+        return self.working_folders.get(target_system, default)
+
+    def setting(self, system, target_system, key):
+        """Looks up "<target> <key>" for a system, falling back to the untargeted "<key>"."""
+        settings = self.aliases.get(system, {})
+        return settings.get(f"{target_system} {key}", settings.get(key))
+
+    def drive_view(self, selected_drive):
+        """
+        alias -> settings with "drive:" replaced by selected_drive; built once per
+        drive. Off Windows the backslashes become "/" so "/media/SDCARD" works too.
+        """
+        selected_drive = selected_drive or ""
+        view = self._drive_views.get(selected_drive)
+        if view is None:
+            per_section = {}
+            for names, settings in self.sections:
+                values = {key: value.replace("drive:", selected_drive) for key, value in settings.items()}
+                if os.sep == "/":
+                    values = {key: value.replace("\\", "/") for key, value in values.items()}
+                per_section[id(settings)] = MappingProxyType(values)
+            view = MappingProxyType({alias: per_section[id(settings)] for alias, settings in self.aliases.items()})
+            self._drive_views[selected_drive] = view
+        return view
+
+_master_cache = {}
+
+class MasterConfigError(RuntimeError):
+    """Raised when Master.txt can't be read; without it no system has a destination."""
+
+def load_master_config(path=None):
+    """
+    Returns the MasterConfig for Master.txt, parsing the file only when its
+    mtime or size changed since the last call. Raises MasterConfigError if
+    the file is missing instead of treating every system as unmapped.
+    """
+    path = path or MASTER_CONFIG
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        _master_cache.pop(path, None)
+        raise MasterConfigError(f"Master.txt not found at {path}") from e
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _master_cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        config = MasterConfig.parse(f)
+    _master_cache[path] = (key, config)
+    return config
+
+# -----------------------------
+# Library Inventory
+# -----------------------------
+# Companion files that are never matched or sorted on their own; they go
+# wherever the main file with the same name goes (see RomSetIndex).
+EXCLUDED_EXTENSIONS = (".ips", ".bps", ".bin", ".sav")
+# "(Track 2)" on the .bin tracks of a CUE/BIN game.
+TRACK_TAG_RE = re.compile(r"\s*\(track\s*[0-9]+\)", re.IGNORECASE)
+
+def rom_set_key(filename):
+    """Lower-cased name without extension or track tag; a main file and its companions share it."""
+    return " ".join(TRACK_TAG_RE.sub("", os.path.splitext(filename)[0]).split()).lower()
+
+class RomSetIndex:
+    """
+    A system's files grouped in one pass: each main file with its companions
+    (.cue/.bin tracks, .ips/.bps patches, .sav, an .m3u of the same name), and
+    every file under its cleaned title. Moving a game with everything that
+    belongs to it is a dict lookup instead of another scan of the folder.
+    """
+
+    def __init__(self, filenames):
+        self.sets = {}
+        self.titles = {}
+        self.mains = []
+        for filename in filenames:
+            self.sets.setdefault(rom_set_key(filename), []).append(filename)
+            self.titles.setdefault(clean_title(filename), []).append(filename)
+            if not filename.lower().endswith(EXCLUDED_EXTENSIONS):
+                self.mains.append(filename)
+
+    def rom_set(self, filename):
+        """filename followed by the other files of its set."""
+        return [filename] + [f for f in self.sets.get(rom_set_key(filename), ()) if f != filename]
+
+    def title_files(self, filename):
+        """Every file (any region or revision, with companions) whose cleaned title matches filename's."""
+        return self.titles.get(clean_title(filename), [])
+
+class LibraryInventory:
+    """
+    os.scandir snapshot of a working folder (ROMS), shared by every menu action.
+
+    Each directory is listed once and its DirEntry objects are kept, so file/dir
+    checks don't cost an extra stat per entry. A snapshot is reused while the
+    directory's own mtime is unchanged; operations that move, copy or delete
+    files call refresh() for the systems they touched. Sizes are stat'ed fresh.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._dirs = {}
+
+    def path(self, system=None, sub=None):
+        parts = [self.root] + [part for part in (system, sub) if part]
+        return os.path.join(*parts)
+
+    def _entries(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self._dirs.pop(path, None)
+            return {}
+        cached = self._dirs.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        entries = {}
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    entries[entry.name] = entry
+        except OSError:
+            return {}
+        self._dirs[path] = (mtime, entries)
+        return entries
+
+    def systems(self):
+        """Immediate subdirectories of the working folder."""
+        return [name for name, entry in self._entries(self.root).items() if entry.is_dir()]
+
+    def is_dir(self, system, sub=None):
+        parent = self._entries(self.path(system) if sub else self.root)
+        entry = parent.get(sub or system)
+        return entry is not None and entry.is_dir()
+
+    def subdirs(self, system, sub=None):
+        return [name for name, entry in self._entries(self.path(system, sub)).items() if entry.is_dir()]
+
+    def files(self, system, sub=None):
+        """Names of the regular files (symlinks followed) in ROMS\\<system>[\\<sub>]."""
+        return [name for name, entry in self._entries(self.path(system, sub)).items()
+                if entry.is_file() and not is_tool_file(name)]
+
+    def has_files(self, system, sub=None):
+        return any(entry.is_file() and not is_tool_file(name)
+                   for name, entry in self._entries(self.path(system, sub)).items())
+
+    def roms(self, system):
+        """Main ROM files of a system, without patches/companions."""
+        return [f for f in self.files(system) if not f.lower().endswith(EXCLUDED_EXTENSIONS)]
+
+    def rom_sets(self, system):
+        return RomSetIndex(self.files(system))
+
+    def covers(self, system):
+        """PNG files in the system's "cover art" folder."""
+        return [f for f in self.files(system, "cover art") if f.lower().endswith(".png")]
+
+    def size(self, system, name, sub=None):
+        """
+        Always a fresh stat: a file rewritten in place doesn't change its folder's
+        mtime, so the DirEntry kept from the listing could have the old size.
+        """
+        return os.path.getsize(os.path.join(self.path(system, sub), name))
+
+    def refresh(self, system=None):
+        """Forget cached listings for one system (and its subfolders) or everything."""
+        if system is None:
+            self._dirs.clear()
+            return
+        prefix = self.path(system)
+        self._dirs.pop(self.root, None)
+        # list() takes a snapshot in one step; pipeline stages refresh while others list.
+        for path in [p for p in list(self._dirs) if p == prefix or p.startswith(prefix + os.sep)]:
+            self._dirs.pop(path, None)
+
+_inventories = {}
+
+def get_inventory(effective_dir):
+    inventory = _inventories.get(effective_dir)
+    if inventory is None:
+        inventory = _inventories[effective_dir] = LibraryInventory(effective_dir)
+    return inventory
+
+# -----------------------------
+# Archives (.zip / .7z)
+# -----------------------------
+# A damaged or unsupported archive raises one of these.
+ARCHIVE_ERRORS = (OSError, ValueError, EOFError, zipfile.BadZipFile) + ((py7zr.Bad7zFile,) if py7zr else ())
+
+# path -> ((size, mtime_ns), members); copy threads and pipeline stages share it.
+_archive_cache = {}
+
+class ArchiveMember:
+    """A file inside an archive as listed in its directory; name is without the folders inside the archive."""
+
+    def __init__(self, name, path, size, crc=None):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.crc = crc
+
+def is_archive(filename):
+    """A .zip, or a .7z when py7zr is installed (otherwise a .7z is copied like any other file)."""
+    lower = filename.lower()
+    return lower.endswith(".zip") or (lower.endswith(".7z") and py7zr is not None)
+
+def _list_archive(path):
+    if path.lower().endswith(".zip"):
+        # infolist() is read from the central directory at the end of the file; nothing is decompressed.
+        with zipfile.ZipFile(path) as zf:
+            return [(info.filename, info.file_size, info.CRC) for info in zf.infolist() if not info.is_dir()]
+    with py7zr.SevenZipFile(path, "r") as archive:
+        return [(info.filename, info.uncompressed, getattr(info, "crc32", None))
+                for info in archive.list() if not info.is_directory]
+
+def archive_members(path):
+    """
+    The files inside a .zip (or .7z with py7zr), largest first, read from the
+    archive's directory only. Listings are kept while the archive's size and
+    mtime don't change. Returns [] for an archive that can't be read.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return []
+    key = (st.st_size, st.st_mtime_ns)
+    cached = _archive_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    try:
+        listing = _list_archive(path)
+    except ARCHIVE_ERRORS as e:
+        print(f"⚠ Could not read {os.path.basename(path)}: {e}")
+        listing = []
+    members = {}
+    for inner, size, crc in listing:
+        name = posixpath.basename(inner.replace("\\", "/"))
+        if name and name not in members:
+            members[name] = ArchiveMember(name, inner, size, crc)
+    members = sorted(members.values(), key=lambda member: (-member.size, member.name.lower()))
+    _archive_cache[path] = (key, members)
+    return members
+
+def main_member(members):
+    """The member a game is known by: its cue sheet, else its biggest file that isn't a companion."""
+    for extensions in (DISC_SHEET_EXTENSIONS, None):
+        for member in members:
+            lower = member.name.lower()
+            if lower.endswith(extensions) if extensions else not lower.endswith(EXCLUDED_EXTENSIONS):
+                return member
+    return members[0] if members else None
+
+def archive_main_members(folder, filenames):
+    """{archive: its main member} for the archives among filenames in folder."""
+    found = {}
+    for filename in filenames:
+        if is_archive(filename):
+            member = main_member(archive_members(os.path.join(folder, filename)))
+            if member is not None:
+                found[filename] = member
+    return found
+
+def extracts_archives(config, system, target_system=None):
+    """
+    True when the system's archives go to the drive extracted ("- wii extract = yes"
+    in Master.txt, for emulators that can't open a .zip). Without a target, any
+    target that extracts counts.
+    """
+    settings = config.aliases.get(system, {})
+    if target_system is None:
+        values = [value for key, value in settings.items() if key == "extract" or key.endswith(" extract")]
+    else:
+        values = [config.setting(system, target_system, "extract") or ""]
+    return any(value.strip().lower() in ("yes", "y", "true", "1") for value in values)
+
+def extract_member(archive_path, member, dst_path):
+    """
+    Decompresses one member of an archive straight into dst through a partial
+    file, renamed into place when complete. A .zip member is streamed (and its
+    CRC checked by zipfile as it's read); py7zr writes a .7z member itself.
+    """
+    partial_path = dst_path + PARTIAL_SUFFIX
+    if archive_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as zf, zf.open(member.path) as src, open(partial_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_BYTES)
+            if COPY_FSYNC:
+                dst.flush()
+                os.fsync(dst.fileno())
+        done = os.path.getsize(partial_path)
+        if done != member.size:
+            raise OSError(f"{member.name} in {os.path.basename(archive_path)} came out {done} of {member.size} bytes")
+        os.replace(partial_path, dst_path)
+        return
+    # py7zr extracts into a folder; the member lands in a partial folder next to dst.
+    if os.path.isfile(partial_path):
+        os.remove(partial_path)
+    try:
+        with py7zr.SevenZipFile(archive_path, "r") as archive:
+            archive.extract(path=partial_path, targets=[member.path])
+        extracted = os.path.join(partial_path, *member.path.replace("\\", "/").split("/"))
+        if COPY_FSYNC:
+            fsync_path(extracted)
+        os.replace(extracted, dst_path)
+    finally:
+        shutil.rmtree(partial_path, ignore_errors=True)
+
+def copy_sources(inventory, system, sub=None, extract=False):
+    """
+    (name on the drive, source path, size, archive member or None) for every file
+    in ROMS\\<system>[\\<sub>]; with extract, an archive gives one entry per member.
+    """
+    folder = inventory.path(system, sub)
+    sources = []
+    seen = set()
+    for filename in sorted(inventory.files(system, sub)):
+        path = os.path.join(folder, filename)
+        members = archive_members(path) if extract and is_archive(filename) else None
+        entries = [(member.name, path, member.size, member) for member in members] if members else \
+            [(filename, path, inventory.size(system, filename, sub), None)]
+        for entry in entries:
+            # Two archives holding the same file name would write the same drive file; the first one wins.
+            if entry[0].lower() not in seen:
+                seen.add(entry[0].lower())
+                sources.append(entry)
+    return sources
+
+# -----------------------------
+# Helper: Get Expected Systems
+# -----------------------------
+def get_expected_systems():
+    return load_master_config().expected_systems
 
 # -----------------------------
 # Helper: Get Common Systems
@@ -76,23 +691,133 @@ def get_common_systems(effective_dir):
     Appends "All Systems" to the list.
     """
     expected_set = get_expected_systems()
+    inventory = get_inventory(effective_dir)
     systems = []
-    for d in os.listdir(effective_dir):
-        d_path = os.path.join(effective_dir, d)
-        if not os.path.isdir(d_path):
-            continue
+    for d in inventory.systems():
         if d not in expected_set:
             continue
-        rom_files = [f for f in os.listdir(d_path) if os.path.isfile(os.path.join(d_path, f))]
-        cover_art_path = os.path.join(d_path, "cover art")
-        cover_art_files = []
-        if os.path.isdir(cover_art_path):
-            cover_art_files = [f for f in os.listdir(cover_art_path) if os.path.isfile(os.path.join(cover_art_path, f))]
-        if rom_files and cover_art_files:
+        if inventory.has_files(d) and inventory.has_files(d, "cover art"):
             systems.append(d)
     systems.append("All Systems")
     return systems
 
+# -----------------------------
+# Drive Discovery
+# -----------------------------
+# Mounted filesystems are listed again after this many seconds (cards get swapped at the menu).
+DRIVE_CACHE_SECONDS = 5
+# On Linux/macOS only mounts below these folders are offered (SD cards, USB drives).
+DRIVE_MOUNT_PREFIXES = ("/media/", "/mnt/", "/run/media/", "/Volumes/")
+# Filesystems in /proc/mounts that can be a console's card or drive.
+DRIVE_FILESYSTEMS = ("vfat", "msdos", "exfat", "ntfs", "ntfs3", "fuseblk", "ext2", "ext3", "ext4", "btrfs", "xfs",
+                     "f2fs", "hfsplus", "apfs")
+
+class DriveInfo:
+    """A drive root that can replace "drive:" in Master.txt, with its free space."""
+
+    def __init__(self, root, fstype=None, total=None, free=None, cluster=None):
+        self.root = root
+        self.fstype = fstype
+        self.total = total
+        self.free = free
+        self.cluster = cluster
+
+    def describe(self):
+        text = self.root
+        if self.fstype:
+            text += f" ({self.fstype})"
+        if self.free is not None and self.total:
+            text += f" - {format_bytes(self.free)} free of {format_bytes(self.total)}"
+        return text
+
+def drive_space(root):
+    """(total, free, cluster size) of the filesystem holding root, or (None, None, None)."""
+    try:
+        if hasattr(os, "statvfs"):
+            st = os.statvfs(root)
+            return st.f_blocks * st.f_frsize, st.f_bavail * st.f_frsize, st.f_frsize
+        usage = shutil.disk_usage(root)
+        return usage.total, usage.free, None
+    except OSError:
+        return None, None, None
+
+def read_proc_mounts(path="/proc/mounts"):
+    """[(mount point, filesystem)] of the removable-looking mounts in /proc/mounts."""
+    mounts = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+    except OSError:
+        return mounts
+    for line in lines:
+        parts = line.split()
+        if len(parts) < 3 or not parts[0].startswith("/dev/") or parts[2] not in DRIVE_FILESYSTEMS:
+            continue
+        # Spaces and other odd characters are octal escapes ("/media/SD\040CARD").
+        mount_point = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), parts[1])
+        if mount_point.startswith(DRIVE_MOUNT_PREFIXES):
+            mounts.append((mount_point, parts[2]))
+    return mounts
+
+_drive_cache = (0.0, [])
+
+def list_drives(refresh=False):
+    """
+    The drives a copy can go to: drive letters on Windows, removable mounts
+    from /proc/mounts on Linux (the folders in /Volumes on macOS). Cached for
+    DRIVE_CACHE_SECONDS.
+    """
+    global _drive_cache
+    listed_at, drives = _drive_cache
+    if not refresh and time.monotonic() - listed_at < DRIVE_CACHE_SECONDS:
+        return drives
+    if sys.platform.startswith("win"):
+        roots = [(f"{d}:\\", None) for d in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" if os.path.exists(f"{d}:\\")]
+    elif os.path.exists("/proc/mounts"):
+        roots = read_proc_mounts()
+    else:
+        try:
+            roots = [(os.path.join("/Volumes", name), None) for name in sorted(os.listdir("/Volumes"))
+                     if os.path.ismount(os.path.join("/Volumes", name))]
+        except OSError:
+            roots = []
+    drives = []
+    for root, fstype in roots:
+        total, free, cluster = drive_space(root)
+        drives.append(DriveInfo(root, fstype, total, free, cluster))
+    _drive_cache = (time.monotonic(), drives)
+    return drives
+
+# -----------------------------
+# Helper: Select Drive
+# -----------------------------
+def select_drive(purpose, operation_name):
+    """
+    Lists the drives that are plugged in, with their free space, and asks which
+    one to use. Returns the drive root (ie. "E:\\" or "/media/SDCARD") or None
+    if there are none or the user cancels.
+    """
+    available_drives = list_drives(refresh=True)
+    if not available_drives:
+        print(f"No available drives found. Exiting {operation_name}...")
+        return None
+    print("\nAvailable drives:")
+    for idx, drive in enumerate(available_drives, start=1):
+        print(f"{idx}. {drive.describe()}")
+    drive_choice = ask(f"Enter the number corresponding to the drive to {purpose} (or 0 to cancel): ").strip()
+    if drive_choice == "0":
+        print(f"Cancelling {operation_name}...")
+        return None
+    try:
+        drive_choice = int(drive_choice)
+    except ValueError:
+        print("Invalid drive selection.")
+        return None
+    if drive_choice < 1 or drive_choice > len(available_drives):
+        print("Invalid drive selection.")
+        return None
+    return available_drives[drive_choice - 1].root
+
 # -----------------------------
 # Helper: Get Multiple Selections
 # -----------------------------
@@ -104,7 +829,7 @@ def get_multiple_selections(options, prompt):
     print(prompt)
     for idx, option in enumerate(options, start=1):
         print(f"{idx}. {option}")
-    selection = input("Enter your choice(s) separated by commas (or 0 to cancel): ")
+    selection = ask("Enter your choice(s) separated by commas (or 0 to cancel): ")
     if selection.strip() == "0":
         return None
     tokens = selection.split(',')
@@ -126,167 +851,2287 @@ def get_multiple_selections(options, prompt):
 def remove_parentheses(text):
     return re.sub(r'\([^)]*\)', '', text).strip()
 
+def clean_title(filename):
+    """
+    Returns the lower-cased name used for cover art matching: extension and
+    any parenthesized tags removed.
+    """
+    return remove_parentheses(os.path.splitext(filename)[0]).lower()
+
 # -----------------------------
-# File Sorting Functions
+# Cover Art Matching Engine
 # -----------------------------
-def sort_files(effective_dir):
-    base_roms_dir = effective_dir
-    system_dirs = [d for d in os.listdir(base_roms_dir) if os.path.isdir(os.path.join(base_roms_dir, d))]
-    if not system_dirs:
-        print("No system directories found in ROMS.")
-        return
-    for system_dir in system_dirs:
-        base_dir = os.path.join(base_roms_dir, system_dir)
-        if not os.path.exists(base_dir):
-            print(f"Directory {base_dir} does not exist.")
-            continue
-        excluded_extensions = (".ips", ".bps", ".bin")
-        all_files = [f for f in os.listdir(base_dir)
-                     if os.path.isfile(os.path.join(base_dir, f)) and not f.lower().endswith(excluded_extensions)]
-        def get_folder(filename):
-            lower_name = filename.lower()
-            if "(e)" in lower_name or "(eur)" in lower_name or "(europe)" in lower_name:
-                return "Europe"
-            elif "(f)" in lower_name or "(france)" in lower_name:
-                return "France"
-            elif "(g)" in lower_name or "(germany)" in lower_name:
-                return "Germany"
-            elif "(i)" in lower_name or "(italy)" in lower_name:
-                return "Italy"
-            elif "(s)" in lower_name or "(sweden)" in lower_name:
-                return "Sweden"
-            elif "(spain)" in lower_name:
-                return "Spain"
-            elif "(netherlands)" in lower_name:
-                return "Netherlands"
-            elif "(australia)" in lower_name:
-                return "Australia"
-            elif "(brazil)" in lower_name:
-                return "Brazil"
-            elif "(asia)" in lower_name:
-                return "Asia"
-            return None
-        category_folders = ["Europe", "France", "Germany", "Italy", "Sweden", "Spain", "Netherlands", "Australia", "Brazil", "Asia", "Translated"]
-        for folder in category_folders:
-            os.makedirs(os.path.join(base_dir, folder), exist_ok=True)
-        for main_file in all_files:
-            file_path = os.path.join(base_dir, main_file)
-            folder = get_folder(main_file)
-            if folder:
-                dest_folder = os.path.join(base_dir, folder)
-                shutil.move(file_path, os.path.join(dest_folder, main_file))
-                print(f"Moved {main_file} to {dest_folder}")
-            else:
-                print(f"No category found for file: {main_file}")
-        for folder in category_folders:
-            folder_path = os.path.join(base_dir, folder)
-            if os.path.exists(folder_path) and not os.listdir(folder_path):
-                os.rmdir(folder_path)
-    print("File sorting complete.")
+MATCH_THRESHOLD = 0.75
+# "index" uses CoverArtIndex; "brute" scores every PNG like the original loop.
+MATCH_ENGINE = "index"
+# How many trigram-ranked candidates get an exact ratio before pruning.
+MATCH_CANDIDATES = 16
 
-def unsort_files(effective_dir):
-    base_roms_dir = effective_dir
-    system_dirs = [d for d in os.listdir(base_roms_dir) if os.path.isdir(os.path.join(base_roms_dir, d))]
-    if not system_dirs:
-        print("No system directories found in ROMS.")
-        return
-    category_folders = ["Europe", "France", "Germany", "Italy", "Sweden", "Spain", "Netherlands", "Australia", "Brazil", "Asia", "Translated"]
-    for system_dir in system_dirs:
-        base_dir = os.path.join(base_roms_dir, system_dir)
-        if not os.path.exists(base_dir):
-            print(f"Directory {base_dir} does not exist.")
-            continue
-        for folder in category_folders:
-            folder_path = os.path.join(base_dir, folder)
-            if os.path.exists(folder_path):
-                for file in os.listdir(folder_path):
-                    shutil.move(os.path.join(folder_path, file), os.path.join(base_dir, file))
-                    print(f"Moved {file} from {folder_path} back to {base_dir}")
-                os.rmdir(folder_path)
-    print("File unsorting complete.")
+def brute_force_best_match(rom_clean, png_files, png_cleans=None):
+    """
+    Reference matcher: scores the ROM against every PNG and keeps the first
+    PNG with the highest ratio. Returns (best_png, highest_ratio).
+    """
+    best_match = None
+    highest_ratio = 0.0
+    for idx, png in enumerate(png_files):
+        base_png_clean = png_cleans[idx] if png_cleans is not None else clean_title(png)
+        ratio = difflib.SequenceMatcher(None, rom_clean, base_png_clean).ratio()
+        if ratio > highest_ratio:
+            highest_ratio = ratio
+            best_match = png
+    return best_match, highest_ratio
 
-# -----------------------------
-# # Working Directory
-# -----------------------------
-def get_working_folder(target_system):
-    mapping = {}
-    if os.path.exists(MASTER_CONFIG):
-        current_section = None
-        with open(MASTER_CONFIG, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count
+else:
+    def _popcount(value):
+        return bin(value).count("1")
+
+class CoverArtIndex:
+    """
+    Normalizes the PNG names of a "cover art" folder once and answers
+    best-match queries without scoring every PNG.
+
+    Candidates are ranked through a character-trigram inverted index and
+    scored exactly with difflib. Every other PNG is then checked against an
+    upper bound of SequenceMatcher.ratio() (the shared character multiset,
+    i.e. quick_ratio(), stored as a bitmask per PNG) and is only scored when
+    it could still beat the current best at or above MATCH_THRESHOLD. Matches
+    at or above the threshold are therefore identical to
+    brute_force_best_match(), including its first-PNG-wins tie break. For a
+    ROM below the threshold the reported ratio is the best seen among the
+    scored candidates.
+    """
+
+    def __init__(self, png_files, png_cleans=None):
+        self.png_files = list(png_files)
+        if png_cleans is None:
+            png_cleans = [clean_title(png) for png in self.png_files]
+        # PNGs sharing a cleaned name always tie; only the first can win.
+        self.entries = []
+        self.exact = {}
+        for idx, clean in enumerate(png_cleans):
+            if clean in self.exact:
+                continue
+            self.exact[clean] = len(self.entries)
+            self.entries.append((idx, clean))
+        self._token_bits = {}
+        self.masks = [self._mask(clean, grow=True) for _, clean in self.entries]
+        self.lengths = [len(clean) for _, clean in self.entries]
+        self.postings = {}
+        for pos, (_, clean) in enumerate(self.entries):
+            for gram in _trigrams(clean):
+                self.postings.setdefault(gram, []).append(pos)
+        # Very common trigrams only add noise to candidate ranking.
+        self.stop_limit = max(50, len(self.entries) // 10)
+
+    def _mask(self, text, grow=False):
+        """Bitmask of (character, occurrence) tokens; popcount of an AND is the multiset intersection."""
+        mask = 0
+        counts = {}
+        for ch in text:
+            n = counts.get(ch, 0)
+            counts[ch] = n + 1
+            bit = self._token_bits.get((ch, n))
+            if bit is None:
+                if not grow:
                     continue
-                if line.startswith("[") and line.endswith("]"):
-                    section = line[1:-1].strip()
-                    if section.lower() == "working folder":
-                        current_section = "working folder"
-                    else:
-                        current_section = None
-                elif current_section == "working folder" and line.startswith("-"):
-                    parts = line[1:].split("=", 1)
-                    if len(parts) == 2:
-                        key = parts[0].strip()  # Preserve case
-                        value = parts[1].strip()
-                        mapping[key] = value
-    else:
-        print("Master.txt not found. Defaulting working folder to 'Systems'.")
-        mapping = {}
+                bit = self._token_bits[(ch, n)] = len(self._token_bits)
+            mask |= 1 << bit
+        return mask
 
-    # Removed special mapping; use the target system name directly.
-    key = target_system
-    working_folder = mapping.get(key, "Systems")
-    return working_folder\
+    def candidates(self, rom_clean, limit=MATCH_CANDIDATES):
+        """Positions of the entries sharing the most trigrams with rom_clean."""
+        scores = {}
+        for gram in _trigrams(rom_clean):
+            posting = self.postings.get(gram)
+            if not posting or len(posting) > self.stop_limit:
+                continue
+            for pos in posting:
+                scores[pos] = scores.get(pos, 0) + 1
+        ranked = sorted(scores, key=lambda pos: (-scores[pos], pos))
+        return ranked[:limit]
+
+    def best_match(self, rom_clean, threshold=MATCH_THRESHOLD):
+        """Returns (best_png, ratio) with the same result as brute_force_best_match() at or above threshold."""
+        if not self.entries:
+            return None, 0.0
+        # Only identical names score 1.0, and the first such PNG is the one brute force keeps.
+        pos = self.exact.get(rom_clean)
+        if pos is not None:
+            return self.png_files[self.entries[pos][0]], 1.0
+        best_pos = None
+        best_ratio = 0.0
+        matcher = difflib.SequenceMatcher(None, rom_clean, "")
+        scored = set()
+
+        def consider(pos):
+            nonlocal best_pos, best_ratio
+            scored.add(pos)
+            matcher.set_seq2(self.entries[pos][1])
+            ratio = matcher.ratio()
+            if ratio > best_ratio or (ratio == best_ratio and ratio > 0 and pos < best_pos):
+                best_ratio = ratio
+                best_pos = pos
+
+        for pos in self.candidates(rom_clean):
+            consider(pos)
+
+        rom_mask = self._mask(rom_clean)
+        rom_len = len(rom_clean)
+        for pos in range(len(self.entries)):
+            if pos in scored:
+                continue
+            total = rom_len + self.lengths[pos]
+            if not total:
+                continue
+            bound = 2.0 * _popcount(rom_mask & self.masks[pos]) / total
+            if bound < threshold or bound < best_ratio:
+                continue
+            if bound == best_ratio and best_pos is not None and pos > best_pos:
+                continue
+            consider(pos)
+
+        if best_pos is None:
+            return None, 0.0
+        return self.png_files[self.entries[best_pos][0]], best_ratio
+
+def find_best_matches(rom_files, png_files, engine=None):
+    """
+    Matches each ROM to its best cover art PNG. Returns a list of
+    (rom, best_png, ratio) tuples in ROM order.
+    """
+    engine = engine or MATCH_ENGINE
+    png_cleans = [clean_title(png) for png in png_files]
+    results = []
+    if engine == "brute":
+        for rom in rom_files:
+            best, ratio = brute_force_best_match(clean_title(rom), png_files, png_cleans)
+            results.append((rom, best, ratio))
+        return results
+    index = CoverArtIndex(png_files, png_cleans)
+    for rom in rom_files:
+        best, ratio = index.best_match(clean_title(rom))
+        results.append((rom, best, ratio))
+    return results
+
+def compare_match_engines(rom_files, png_files, threshold=MATCH_THRESHOLD):
+    """
+    Runs the indexed and brute-force matchers side by side and prints timing
+    plus any ROM whose matched cover differs. Returns the list of mismatches.
+    """
+    start = time.perf_counter()
+    brute = find_best_matches(rom_files, png_files, engine="brute")
+    brute_time = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = find_best_matches(rom_files, png_files, engine="index")
+    index_time = time.perf_counter() - start
+
+    mismatches = []
+    for (rom, b_png, b_ratio), (_, i_png, i_ratio) in zip(brute, indexed):
+        b_hit = b_png if b_ratio >= threshold else None
+        i_hit = i_png if i_ratio >= threshold else None
+        if b_hit != i_hit or (b_hit and b_ratio != i_ratio):
+            mismatches.append((rom, b_hit, b_ratio, i_hit, i_ratio))
+            print(f"❌ {rom}: brute {b_hit} ({b_ratio:.2f}) vs index {i_hit} ({i_ratio:.2f})")
+    print(f"Brute force: {brute_time:.2f}s, index: {index_time:.2f}s, "
+          f"{len(rom_files)} ROMs x {len(png_files)} PNGs, {len(mismatches)} mismatches")
+    return mismatches
 
 # -----------------------------
-# Run Copy to Drive
+# Parallel Cover Art Matching
 # -----------------------------
-def run_copy_to_drive(target_system, effective_dir, selected_systems=None):
+# Worker processes for matching; 1 keeps everything in-process, 0 uses every core.
+MATCH_WORKERS = 1
+# ROMs per task handed to a worker process.
+MATCH_CHUNK_SIZE = 200
+
+_worker_covers = {}
+_worker_indexes = {}
+_worker_engine = None
+
+def _init_match_worker(covers_by_system, engine):
+    """Receives every system's cover list once per worker process."""
+    global _worker_covers, _worker_indexes, _worker_engine
+    _worker_covers = covers_by_system
+    _worker_indexes = {}
+    _worker_engine = engine
+
+def _match_chunk(system, rom_files):
+    png_files, png_cleans = _worker_covers[system]
+    if _worker_engine == "brute":
+        return [(rom,) + brute_force_best_match(clean_title(rom), png_files, png_cleans) for rom in rom_files]
+    index = _worker_indexes.get(system)
+    if index is None:
+        index = _worker_indexes[system] = CoverArtIndex(png_files, png_cleans)
+    return [(rom,) + index.best_match(clean_title(rom)) for rom in rom_files]
+
+def process_pool(workers, **kwargs):
     """
-    Copies files to a selected drive based on paths in Master.txt.
-    Fix: Now filters systems based on local ROMS folder instead of the destination drive.
+    ProcessPoolExecutor that is safe to create while other threads run (the
+    pipeline stages). Forking then can copy a lock another thread is holding
+    into the workers, so off the main thread they come from the forkserver
+    (started by run_pipeline before its threads) instead.
     """
+    context = None
+    if threading.current_thread() is not threading.main_thread():
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, **kwargs)
 
-    # Step 1: Select a Drive
-    available_drives = [f"{d}:\\" for d in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" if os.path.exists(f"{d}:\\")]
-    if not available_drives:
-        print("No available drives found. Exiting Copy to Drive...")
-        return
-    print("\nAvailable drives:")
-    for idx, drive in enumerate(available_drives, start=1):
-        print(f"{idx}. {drive}")
-    drive_choice = input("Enter the number corresponding to the drive to copy to (or 0 to cancel): ").strip()
-    if drive_choice == "0":
-        print("Cancelling Copy to Drive...")
-        return
+def resolve_worker_count(workers):
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, workers)
+
+def match_systems(jobs, workers=None, engine=None):
+    """
+    Matches several systems at once. jobs maps system -> (rom_files, png_files).
+    Work is split by system and by ROM chunk across a ProcessPoolExecutor when
+    more than one worker is configured. Returns system -> [(rom, best_png, ratio)]
+    in the same order as the serial path.
+    """
+    engine = engine or MATCH_ENGINE
+    workers = resolve_worker_count(MATCH_WORKERS if workers is None else workers)
+    total_roms = sum(len(roms) for roms, _ in jobs.values())
+    if workers == 1 or total_roms <= MATCH_CHUNK_SIZE:
+        return {system: find_best_matches(roms, pngs, engine) for system, (roms, pngs) in jobs.items()}
+
+    covers = {system: (list(pngs), [clean_title(png) for png in pngs]) for system, (_, pngs) in jobs.items()}
+    results = {system: [None] * len(roms) for system, (roms, _) in jobs.items()}
+    with process_pool(workers, initializer=_init_match_worker, initargs=(covers, engine)) as pool:
+        futures = {}
+        for system, (roms, _) in jobs.items():
+            for start in range(0, len(roms), MATCH_CHUNK_SIZE):
+                future = pool.submit(_match_chunk, system, roms[start:start + MATCH_CHUNK_SIZE])
+                futures[future] = (system, start)
+        for future in as_completed(futures):
+            system, start = futures[future]
+            chunk = future.result()
+            results[system][start:start + len(chunk)] = chunk
+    return results
+
+# -----------------------------
+# Cover Art Match Cache
+# -----------------------------
+# Lives in ROMS\<system> next to "renamed cover art"; never treated as a ROM.
+MATCH_CACHE_NAME = "cover art match cache.json"
+MATCH_CACHE_VERSION = 1
+# Content hashes of the ROMs (see Content Hashing).
+HASH_CACHE_NAME = "rom hash cache.json"
+# What the cover art optimizer already did to "renamed cover art" (see Cover Art Optimization).
+COVER_CACHE_NAME = "cover art optimize cache.json"
+TOOL_FILES = (MATCH_CACHE_NAME, HASH_CACHE_NAME, COVER_CACHE_NAME)
+
+def is_tool_file(filename):
+    """True for files the tool itself keeps inside a system folder."""
+    return filename in TOOL_FILES
+
+def cover_art_fingerprint(cover_art_folder, png_files):
+    """Hash of the PNG names, sizes and mtimes in a cover art folder."""
+    digest = hashlib.sha1()
+    for png in sorted(png_files):
+        try:
+            st = os.stat(os.path.join(cover_art_folder, png))
+        except OSError:
+            continue
+        digest.update(f"{png}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+def load_match_cache(system_path):
+    """Returns the cache dict for a system, or an empty one if missing or unreadable."""
+    cache_path = os.path.join(system_path, MATCH_CACHE_NAME)
     try:
-        drive_choice = int(drive_choice)
-    except ValueError:
-        print("Invalid drive selection.")
-        return
-    if drive_choice < 1 or drive_choice > len(available_drives):
-        print("Invalid drive selection.")
-        return
-    selected_drive = available_drives[drive_choice - 1]
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {"matches": {}}
+    if cache.get("version") != MATCH_CACHE_VERSION or cache.get("threshold") != MATCH_THRESHOLD:
+        return {"matches": {}}
+    cache.setdefault("matches", {})
+    return cache
+
+def save_match_cache(system_path, fingerprint, matches):
+    """Writes {rom: [best_png, ratio(, "dat")]} for a system, replacing the old cache atomically."""
+    cache_path = os.path.join(system_path, MATCH_CACHE_NAME)
+    tmp_path = cache_path + ".tmp"
+    cache = {
+        "version": MATCH_CACHE_VERSION,
+        "threshold": MATCH_THRESHOLD,
+        "cover_fingerprint": fingerprint,
+        "matches": matches,
+    }
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"⚠ Could not write match cache for {system_path}: {e}")
+
+def clear_match_cache(system_path):
+    cache_path = os.path.join(system_path, MATCH_CACHE_NAME)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+def renamed_cover_is_current(src_path, dst_path, same_source=True):
+    """A renamed PNG only needs copying when missing, from another PNG, or older/different in size."""
+    if not same_source:
+        return False
+    try:
+        src_st = os.stat(src_path)
+        dst_st = os.stat(dst_path)
+    except OSError:
+        return False
+    return dst_st.st_size == src_st.st_size and dst_st.st_mtime_ns >= src_st.st_mtime_ns
+
+# -----------------------------
+# Renamed Cover Art Placement
+# -----------------------------
+# How matched PNGs land in "renamed cover art": "copy", "hardlink", "reflink" or "symlink".
+# Anything the filesystem can't do falls back to a normal copy.
+RENAMED_LINK_MODE = "copy"
+LINK_MODES = ("copy", "hardlink", "reflink", "symlink")
+FICLONE = 0x40049409  # Linux ioctl: share extents with another file (btrfs, xfs, bcachefs)
+
+def _reflink(src_path, dst_path):
+    """Clones src into a new dst via FICLONE, else copy_file_range; raises OSError if neither works."""
+    if fcntl is None and not hasattr(os, "copy_file_range"):
+        raise OSError("reflink is not supported on this platform")
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        try:
+            if fcntl is None:
+                raise OSError("FICLONE unavailable")
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return
+        except OSError:
+            if not hasattr(os, "copy_file_range"):
+                raise
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            sent = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if sent == 0:
+                break
+            remaining -= sent
+
+def place_renamed_cover(src_path, dst_path, mode=None):
+    """
+    Puts the matched PNG at dst_path using the requested link mode and returns
+    the mode actually used. An existing dst is unlinked first so a stale
+    hardlink is never written through into the original in "cover art".
+    """
+    mode = mode or RENAMED_LINK_MODE
+    if os.path.lexists(dst_path):
+        os.remove(dst_path)
+    try:
+        if mode == "hardlink":
+            os.link(src_path, dst_path)
+            return mode
+        if mode == "symlink":
+            os.symlink(os.path.relpath(src_path, os.path.dirname(dst_path)), dst_path)
+            return mode
+        if mode == "reflink":
+            _reflink(src_path, dst_path)
+            return mode
+    except (OSError, NotImplementedError):
+        if os.path.lexists(dst_path):
+            os.remove(dst_path)
+    shutil.copy(src_path, dst_path)
+    return "copy"
+
+# -----------------------------
+# Cover Art Optimization
+# -----------------------------
+# Run the optimizer on "renamed cover art" after every match.
+COVER_OPTIMIZE = False
+# Covers bigger than this (width, height) are shrunk to fit, keeping their shape.
+# A system can have its own with "- wii cover size = 1090x680" in Master.txt.
+COVER_BOX_SIZE = (512, 512)
+# Worker processes for resizing; 0 uses every core, 1 keeps it in-process.
+COVER_WORKERS = 0
+
+def cover_box_size(config, system, target_system):
+    """(width, height) from the system's "<target> cover size" entry, else COVER_BOX_SIZE."""
+    value = config.aliases.get(system, {}).get(f"{target_system} cover size", "")
+    match = re.fullmatch(r"\s*(\d+)\s*[xX]\s*(\d+)\s*", value)
+    return (int(match.group(1)), int(match.group(2))) if match else tuple(COVER_BOX_SIZE)
+
+def load_cover_cache(system_path):
+    """Returns {file name: entry} for a system's renamed cover art, or an empty dict."""
+    try:
+        with open(os.path.join(system_path, COVER_CACHE_NAME), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get("files", {})
+
+def save_cover_cache(system_path, files):
+    cache_path = os.path.join(system_path, COVER_CACHE_NAME)
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": files}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"⚠ Could not write cover art optimize cache for {system_path}: {e}")
+
+def optimized_cover_is_current(entry, src_path, dst_path):
+    """True when dst_path is still the optimizer's output and its source in "cover art" hasn't changed since."""
+    if not entry:
+        return False
+    try:
+        src_st = os.stat(src_path)
+        dst_st = os.stat(dst_path)
+    except OSError:
+        return False
+    return (dst_st.st_size == entry.get("size") and dst_st.st_mtime_ns == entry.get("mtime_ns")
+            and dst_st.st_mtime_ns >= src_st.st_mtime_ns)
+
+def _optimize_cover(src_path, tmp_path, box):
+    """
+    Process pool worker: writes src_path shrunk to fit box and recompressed to
+    tmp_path. Returns the new size, or None (and no tmp file) when the cover
+    already fits and recompressing wouldn't make it smaller.
+    """
+    original = os.path.getsize(src_path)
+    with Image.open(src_path) as image:
+        image.load()
+        resized = image.width > box[0] or image.height > box[1]
+        if resized:
+            image.thumbnail(box, Image.LANCZOS)
+        if image.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            image = image.convert("RGBA")
+        image.save(tmp_path, "PNG", optimize=True)
+    size = os.path.getsize(tmp_path)
+    if not resized and size >= original:
+        os.remove(tmp_path)
+        return None
+    return size
+
+@instrumented("covers")
+def run_optimize_cover_art(target_system, effective_dir, selected_systems=None, workers=None):
+    """
+    Shrinks the PNGs in "renamed cover art" to the system's cover size and
+    recompresses them, so less goes to the drive and Wiiflow has less to cache.
+    Covers are tracked by SHA-1: ones the optimizer already wrote are skipped,
+    and identical covers (one scan matched to several games) are only resized
+    once. The originals in "cover art" are never touched.
+    """
+    if Image is None:
+        print("Pillow is not installed (pip install Pillow); skipping cover art optimization.")
+        return
+    inventory = get_inventory(effective_dir)
+    if selected_systems is None:
+        systems = sorted(system for system in inventory.systems() if inventory.has_files(system, "renamed cover art"))
+        if not systems:
+            print("No systems with renamed cover art found. Match cover art first.")
+            return
+        if len(systems) > 1:
+            systems.append("All Systems")
+        selected_systems = get_multiple_selections(systems, "\nSelect system(s) to optimize cover art for:")
+        if selected_systems is None:
+            print("Cancelling cover art optimization...")
+            return
+        if "All Systems" in selected_systems:
+            selected_systems = [system for system in systems if system != "All Systems"]
+
+    config = load_master_config()
+    stats = current_stats()
+    workers = resolve_worker_count(COVER_WORKERS if workers is None else workers)
+    result = {"systems": list(selected_systems), "optimized": 0, "skipped": 0, "bytes_before": 0,
+              "bytes_after": 0, "errors": 0}
+    print("Optimizing cover art on the following systems:")
+    for system in selected_systems:
+        print(f"  - {system}")
+        system_path = inventory.path(system)
+        folder = inventory.path(system, "renamed cover art")
+        box = list(cover_box_size(config, system, target_system))
+        cache = load_cover_cache(system_path)
+        entries = {}
+        groups = {}
+        with stats.phase("scan"):
+            # Outputs already written for this box size, by content.
+            done_hashes = {entry["sha1"] for entry in cache.values() if entry.get("box") == box}
+            for name in inventory.files(system, "renamed cover art"):
+                if not name.lower().endswith(".png"):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entry = cache.get(name)
+                if (entry and entry.get("box") == box and entry.get("size") == st.st_size
+                        and entry.get("mtime_ns") == st.st_mtime_ns):
+                    entries[name] = entry
+                    result["skipped"] += 1
+                    continue
+                sha1 = file_sha1(path)
+                if sha1 in done_hashes:
+                    entries[name] = {"sha1": sha1, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "box": box}
+                    result["skipped"] += 1
+                    continue
+                groups.setdefault(sha1, []).append((name, st.st_size))
+        stats.count("skipped", result["skipped"])
+
+        def finish(names, new_size):
+            """Copies the first cover's output over its duplicates and records them all."""
+            first = os.path.join(folder, names[0][0])
+            sha1 = file_sha1(first)
+            for name, size in names:
+                path = os.path.join(folder, name)
+                if new_size is not None and name != names[0][0]:
+                    shutil.copyfile(first, path + ".tmp")
+                    os.replace(path + ".tmp", path)
+                st = os.stat(path)
+                entries[name] = {"sha1": sha1, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "box": box}
+                result["bytes_before"] += size
+                result["bytes_after"] += st.st_size
+                if new_size is not None:
+                    result["optimized"] += 1
+                    stats.count("optimized")
+                    stats.detail(f"🖼 {name}: {format_bytes(size)} → {format_bytes(st.st_size)}", "optimize",
+                                 system=system, file=name, before=size, after=st.st_size)
+
+        jobs = []
+        for names in groups.values():
+            path = os.path.join(folder, names[0][0])
+            jobs.append((names, path, path + ".tmp"))
+        with stats.phase("optimize"):
+            pool = process_pool(workers) if workers > 1 and len(jobs) > 1 else None
+            try:
+                if pool is None:
+                    outcomes = ((job, functools.partial(_optimize_cover, job[1], job[2], box)) for job in jobs)
+                else:
+                    futures = {pool.submit(_optimize_cover, path, tmp_path, box): (names, path, tmp_path)
+                               for names, path, tmp_path in jobs}
+                    outcomes = ((futures[future], future.result) for future in as_completed(futures))
+                for done, ((names, path, tmp_path), outcome) in enumerate(outcomes, 1):
+                    try:
+                        new_size = outcome()
+                        if new_size is not None:
+                            os.replace(tmp_path, path)
+                        finish(names, new_size)
+                    except Exception as e:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        result["errors"] += 1
+                        stats.end_progress()
+                        print(f"❌ Error optimizing {names[0][0]}: {e}")
+                    stats.progress(done, len(jobs), system)
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+        stats.end_progress()
+        save_cover_cache(system_path, entries)
+        inventory.refresh(system)
+
+    saved = result["bytes_before"] - result["bytes_after"]
+    print(f"✅ Optimized {result['optimized']} cover(s), {result['skipped']} already done; "
+          f"saved {format_bytes(saved)}.")
+    pause(1)
+    return result
+
+# -----------------------------
+# Region Tag Classifier
+# -----------------------------
+# Folder -> No-Intro/GoodTools region tags, in priority order. Master.txt can
+# replace these with a [Region Sort] section ("- Europe = E, EUR, Europe").
+DEFAULT_REGION_RULES = (
+    ("Europe", ("E", "EUR", "Europe")),
+    ("France", ("F", "France")),
+    ("Germany", ("G", "Germany")),
+    ("Italy", ("I", "Italy")),
+    ("Sweden", ("S", "Sweden")),
+    ("Spain", ("Spain",)),
+    ("Netherlands", ("Netherlands",)),
+    ("Australia", ("Australia",)),
+    ("Brazil", ("Brazil",)),
+    ("Asia", ("Asia",)),
+)
+# Folders unsort still empties even though no rule fills them.
+EXTRA_SORT_FOLDERS = ("Translated",)
+
+class RegionClassifier:
+    """
+    Picks the region folder for a file name from its parenthesized tags.
+
+    One compiled regex pulls out every "( ... )" group; each group is split on
+    commas, so "(Europe, Australia)" is understood as two regions. A group only
+    sorts the file when every region in it has a folder; "(USA, Europe)" stays
+    put because the game is also an NTSC release. Groups without any known
+    region (revisions, languages) are ignored. With several candidate folders
+    the earliest rule wins.
+    """
+
+    GROUP_RE = re.compile(r"\(([^()]*)\)")
+
+    def __init__(self, rules):
+        self.folders = tuple(folder for folder, _ in rules)
+        self.priority = {folder: i for i, folder in enumerate(self.folders)}
+        self.tags = {}
+        for folder, tags in rules:
+            for tag in tags:
+                self.tags.setdefault(tag.lower(), folder)
+
+    def classify(self, filename):
+        best = None
+        for group in self.GROUP_RE.findall(filename.lower()):
+            tokens = [token.strip() for token in group.split(",")]
+            folders = [self.tags.get(token) for token in tokens]
+            if not any(folders):
+                continue
+            if not all(folders):
+                return None
+            for folder in folders:
+                if best is None or self.priority[folder] < self.priority[best]:
+                    best = folder
+        return best
+
+# -----------------------------
+# Content Hashing
+# -----------------------------
+# Lives in ROMS\<system> like the match cache; keys are paths relative to the
+# system folder ("Europe/Game (Europe).sfc") and entries are only reused while
+# the file's size and mtime are unchanged.
+HASH_CACHE_VERSION = 1
+HASH_THREADS = 4
+HASH_CHUNK_BYTES = 4 * 1024 * 1024
+# Files at or above this size (ISOs) are hashed through mmap instead of read() calls.
+HASH_MMAP_BYTES = 64 * 1024 * 1024
+
+def hash_file(path):
+    """CRC32, MD5 and SHA-1 of a file in a single pass over its contents, as hex strings."""
+    crc = 0
+    md5 = hashlib.md5()
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= HASH_MMAP_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                for offset in range(0, size, HASH_CHUNK_BYTES):
+                    with view[offset:offset + HASH_CHUNK_BYTES] as chunk:
+                        crc = zlib.crc32(chunk, crc)
+                        md5.update(chunk)
+                        sha1.update(chunk)
+        else:
+            buffer = bytearray(min(HASH_CHUNK_BYTES, max(size, 1)))
+            with memoryview(buffer) as view:
+                while True:
+                    read = f.readinto(buffer)
+                    if not read:
+                        break
+                    with view[:read] as chunk:
+                        crc = zlib.crc32(chunk, crc)
+                        md5.update(chunk)
+                        sha1.update(chunk)
+    return {"crc32": f"{crc:08x}", "md5": md5.hexdigest(), "sha1": sha1.hexdigest()}
+
+def load_hash_cache(system_path):
+    """Returns {relative path: entry} for a system, or an empty dict if missing or unreadable."""
+    try:
+        with open(os.path.join(system_path, HASH_CACHE_NAME), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != HASH_CACHE_VERSION:
+        return {}
+    return cache.get("files", {})
+
+def save_hash_cache(system_path, files):
+    cache_path = os.path.join(system_path, HASH_CACHE_NAME)
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": HASH_CACHE_VERSION, "files": files}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"⚠ Could not write hash cache for {system_path}: {e}")
+
+def hash_system(effective_dir, system, threads=None, names=None):
+    """
+    Hashes the files in ROMS\\<system> and its region folders, reusing cached
+    hashes for files whose size and mtime haven't changed. With names, only
+    those files of the system folder itself are hashed (and returned). Returns
+    ({relative path: {"size", "mtime_ns", "crc32", "md5", "sha1"}}, files hashed).
+    """
+    inventory = get_inventory(effective_dir)
+    system_path = inventory.path(system)
+    stats = current_stats()
+    if names is None:
+        region_folders = set(load_master_config().region_classifier().folders) | set(EXTRA_SORT_FOLDERS)
+        folders = [None] + sorted(folder for folder in inventory.subdirs(system) if folder in region_folders)
+    else:
+        folders = [None]
+    cache = load_hash_cache(system_path)
+    files = {}
+    todo = []
+    with stats.phase("scan"):
+        for sub in folders:
+            for name in (inventory.files(system, sub) if names is None else names):
+                rel = f"{sub}/{name}" if sub else name
+                path = os.path.join(inventory.path(system, sub), name)
+                # A fresh stat: rewriting a file doesn't change its folder's mtime,
+                # so the inventory's cached one could be stale.
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                cached = cache.get(rel)
+                if cached and cached.get("size") == st.st_size and cached.get("mtime_ns") == st.st_mtime_ns:
+                    files[rel] = cached
+                else:
+                    todo.append((rel, path, st))
+    stats.count("cached", len(files))
+
+    def work(item):
+        rel, path, st = item
+        return rel, st, hash_file(path)
+
+    # hashlib and zlib let go of the GIL on big buffers, so threads hash in parallel.
+    with stats.phase("hash"), ThreadPoolExecutor(max_workers=max(1, threads or HASH_THREADS)) as pool:
+        futures = [pool.submit(work, item) for item in todo]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                rel, st, digests = future.result()
+            except OSError as e:
+                stats.end_progress()
+                print(f"❌ Error hashing {e.filename}: {e.strerror}")
+                continue
+            files[rel] = dict(digests, size=st.st_size, mtime_ns=st.st_mtime_ns)
+            stats.count("hashed")
+            stats.count("bytes", st.st_size)
+            stats.detail(f"#️⃣ {system}/{rel} {digests['crc32']}", "hash", system=system, file=rel, **digests)
+            stats.progress(done, len(futures), system)
+    if names is not None:
+        # The entries of the files that weren't asked for stay in the cache.
+        if todo:
+            save_hash_cache(system_path, dict(cache, **files))
+    elif todo or len(files) != len(cache):
+        save_hash_cache(system_path, files)
+    return files, len(todo)
+
+def find_duplicate_roms(hashed):
+    """
+    Groups identical files from {system: {relative path: entry}}. Returns a list
+    of {"sha1", "crc32", "size", "files": ["<system>/<path>", ...]}, biggest waste first.
+    """
+    groups = {}
+    for system, files in hashed.items():
+        for rel, entry in files.items():
+            if not entry["size"]:
+                continue  # empty files are all "the same"
+            groups.setdefault((entry["sha1"], entry["size"]), []).append((f"{system}/{rel}", entry))
+    duplicates = []
+    for (sha1, size), members in groups.items():
+        if len(members) > 1:
+            duplicates.append({"sha1": sha1, "crc32": members[0][1]["crc32"], "size": size,
+                               "files": sorted(path for path, _ in members)})
+    duplicates.sort(key=lambda group: (-group["size"] * (len(group["files"]) - 1), group["files"][0]))
+    return duplicates
+
+# -----------------------------
+# No-Intro / Redump DATs
+# -----------------------------
+# Logiqx XML DATs (No-Intro, Redump) put in this folder name ROMs by their contents.
+DAT_DIR = os.path.join(BASE_DIR, "dats")
+DAT_EXTENSIONS = (".dat", ".xml")
+# Binary CRC/size -> name index of every DAT, rebuilt when a DAT changes.
+DAT_INDEX_NAME = "dat index.bin"
+DAT_INDEX_MAGIC = b"VMTDAT01"
+
+def dat_key(crc, size):
+    """64-bit lookup key: CRC32 in the high half, the low 32 bits of the size in the low half."""
+    return (crc << 32) | (size & 0xFFFFFFFF)
+
+def parse_dat(path):
+    """
+    Yields (crc32, size, game name) for every <rom> of a Logiqx XML DAT.
+    Streams with iterparse and drops each <game> once read, so a Redump
+    DAT of several hundred MB never sits in memory as a whole tree.
+    """
+    root = None
+    for event, elem in ElementTree.iterparse(path, events=("start", "end")):
+        if root is None:
+            root = elem
+        if event != "end" or elem.tag not in ("game", "machine"):
+            continue
+        name = elem.get("name")
+        for rom in elem.iter("rom"):
+            crc, size = rom.get("crc"), rom.get("size")
+            if name and crc and size:
+                try:
+                    yield int(crc, 16), int(size), name
+                except ValueError:
+                    pass
+        root.clear()
+
+class DatIndex:
+    """
+    CRC/size -> canonical game name for every DAT in DAT_DIR. Stored on disk as
+    two packed arrays (keys as uint64, name numbers as uint32) plus the names,
+    which loads far faster than reparsing the XML.
+    """
+
+    def __init__(self, fingerprint, keys, values, names):
+        self.fingerprint = fingerprint
+        self.keys = keys
+        self.values = values
+        self.names = names
+        self.lookup_table = dict(zip(keys, values))
+
+    def __len__(self):
+        return len(self.lookup_table)
+
+    def lookup(self, crc, size):
+        """Canonical name of the game a file with this CRC32 and size belongs to, or None."""
+        value = self.lookup_table.get(dat_key(crc, size))
+        return self.names[value] if value is not None else None
+
+    @classmethod
+    def build(cls, paths, fingerprint):
+        keys = array.array("Q")
+        values = array.array("I")
+        names = []
+        numbers = {}
+        for path in paths:
+            try:
+                for crc, size, name in parse_dat(path):
+                    number = numbers.get(name)
+                    if number is None:
+                        number = numbers[name] = len(names)
+                        names.append(name)
+                    keys.append(dat_key(crc, size))
+                    values.append(number)
+            except (OSError, ElementTree.ParseError) as e:
+                print(f"⚠ Could not read DAT {os.path.basename(path)}: {e}")
+        return cls(fingerprint, keys, values, names)
+
+    def save(self, path):
+        header = json.dumps({"fingerprint": self.fingerprint, "byteorder": sys.byteorder,
+                             "count": len(self.keys)}).encode("utf-8")
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(DAT_INDEX_MAGIC)
+                f.write(struct.pack("<I", len(header)))
+                f.write(header)
+                self.keys.tofile(f)
+                self.values.tofile(f)
+                f.write("\n".join(self.names).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠ Could not write DAT index: {e}")
+
+    @classmethod
+    def load(cls, path, fingerprint):
+        """Returns the saved index when it was built from the same DATs, else None."""
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(DAT_INDEX_MAGIC)) != DAT_INDEX_MAGIC:
+                    return None
+                (header_len,) = struct.unpack("<I", f.read(4))
+                header = json.loads(f.read(header_len).decode("utf-8"))
+                if header.get("fingerprint") != fingerprint or header.get("byteorder") != sys.byteorder:
+                    return None
+                keys = array.array("Q")
+                values = array.array("I")
+                keys.fromfile(f, header["count"])
+                values.fromfile(f, header["count"])
+                blob = f.read().decode("utf-8")
+        except (OSError, ValueError, EOFError, struct.error):
+            return None
+        return cls(fingerprint, keys, values, blob.split("\n") if blob else [])
+
+_dat_index = None
+
+def load_dat_index(dat_dir=None):
+    """
+    Returns the DatIndex for the DATs in dat_dir (DAT_DIR), or None when there
+    are none. Parses the XML only when a DAT was added, removed or changed.
+    """
+    global _dat_index
+    dat_dir = dat_dir or DAT_DIR
+    try:
+        names = sorted(name for name in os.listdir(dat_dir) if name.lower().endswith(DAT_EXTENSIONS))
+    except OSError:
+        return None
+    if not names:
+        return None
+    paths = []
+    fingerprint = []
+    for name in names:
+        path = os.path.join(dat_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue  # removed since the listing
+        paths.append(path)
+        fingerprint.append([name, st.st_size, st.st_mtime_ns])
+    if not paths:
+        return None
+    if _dat_index is not None and _dat_index.fingerprint == fingerprint:
+        return _dat_index
+    index_path = os.path.join(dat_dir, DAT_INDEX_NAME)
+    index = DatIndex.load(index_path, fingerprint)
+    if index is None:
+        print(f"Indexing {len(paths)} DAT file(s)...")
+        index = DatIndex.build(paths, fingerprint)
+        index.save(index_path)
+    _dat_index = index
+    return index
+
+def exact_dat_matches(rom_files, hashes, dat_index, png_files):
+    """
+    Resolves ROMs to their DAT name by CRC32 and size and looks that name up
+    among the PNGs: first the full name ("Mega Man 2 (USA).png"), then the
+    name without tags ("Mega Man 2.png"). Returns ({rom: (png, 1.0)} for the
+    ROMs found, {rom: DAT name} for the ones the DAT knows but no PNG has that
+    name); the rest are left to fuzzy matching.
+    """
+    by_name = {}
+    by_title = {}
+    for png in png_files:
+        by_name.setdefault(os.path.splitext(png)[0].lower(), png)
+        by_title.setdefault(clean_title(png), png)
+    found = {}
+    titles = {}
+    for rom in rom_files:
+        entry = hashes.get(rom)
+        if entry is None:
+            continue
+        canonical = dat_index.lookup(int(entry["crc32"], 16), entry["size"])
+        if canonical is None:
+            continue
+        png = by_name.get(canonical.lower()) or by_title.get(remove_parentheses(canonical).lower())
+        if png is not None:
+            found[rom] = (png, 1.0)
+        else:
+            titles[rom] = canonical
+    return found, titles
+
+# -----------------------------
+# Operation Journal
+# -----------------------------
+# Write-ahead journals of every operation that changes files, one .jsonl per run.
+JOURNAL_DIR = os.path.join(BASE_DIR, "journal")
+# Entries are flushed as they are written; fsync happens every this many records.
+JOURNAL_FSYNC_EVERY = 64
+# Journal names: "<started>-<ns>-<op>.jsonl", so listings can pick an operation without opening files.
+JOURNAL_NAME_RE = re.compile(r"^\d{8}-\d{6}-\d{9}-(.+)\.jsonl$")
+# Where the status line of a finished journal is looked for (it's always the last line).
+JOURNAL_TAIL_BYTES = 4096
+
+class Journal:
+    """
+    Write-ahead log of the file changes made by one operation.
+
+    The first line records the operation and its arguments. Before each
+    move/copy/delete an intent record {"n", "a", "s", "d", "sys"} is appended,
+    and {"ok": n} once it has happened. {"undone": n} marks entries that were
+    reversed and a final {"status": ...} line closes the run; a partial undo
+    writes it again so it stays the last line. A journal without a status line
+    belongs to a run that was interrupted. Folders the run created are
+    journaled as "mkdir" so a rollback can remove them again. Journals with
+    nothing left to undo (fully undone, rolled back, or runs that changed no
+    files) are deleted when they finish.
+    """
+
+    def __init__(self, path, header=None):
+        self.path = path
+        self.header = header or {}
+        self.entries = {}
+        self.done = set()
+        self.undone = set()
+        self.status = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._unsynced = 0
+
+    @property
+    def op(self):
+        return self.header.get("op")
+
+    @property
+    def args(self):
+        return self.header.get("args", {})
+
+    @classmethod
+    def start(cls, op, **args):
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1000000000:09d}-{op}.jsonl"
+        journal = cls(os.path.join(JOURNAL_DIR, name), {"op": op, "args": args, "started": time.time()})
+        journal._write(journal.header, sync=True)
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        journal = cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                if "op" in record and not journal.header:
+                    journal.header = record
+                elif "n" in record:
+                    journal.entries[record["n"]] = record
+                    journal._seq = max(journal._seq, record["n"])
+                elif "ok" in record:
+                    journal.done.add(record["ok"])
+                elif "undone" in record:
+                    journal.undone.add(record["undone"])
+                elif "status" in record:
+                    journal.status = record["status"]
+        return journal
+
+    def _write(self, record, sync=False):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if sync or self._unsynced >= JOURNAL_FSYNC_EVERY:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def begin(self, action, src=None, dst=None, system=None, **extra):
+        """Records the intent to move/copy/delete before it happens; returns its sequence number."""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        entry = {"n": seq, "a": action, "s": src, "d": dst, "sys": system}
+        entry.update(extra)
+        self.entries[seq] = entry
+        self._write(entry)
+        return seq
+
+    def commit(self, seq):
+        self.done.add(seq)
+        self._write({"ok": seq})
+
+    def makedirs(self, path, system=None):
+        """os.makedirs that journals the folder when this run is the one creating it."""
+        if os.path.isdir(path):
+            return False
+        seq = self.begin("mkdir", None, path, system)
+        os.makedirs(path, exist_ok=True)
+        self.commit(seq)
+        return True
+
+    def finish(self, status="complete"):
+        self.status = status
+        self._write({"status": status}, sync=True)
+        self.close()
+        if status in ("undone", "rolled back") or (status == "complete" and not self.entries):
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def performed(self, seq):
+        """True if the entry finished, judging by the files when no "ok" was written."""
+        if seq in self.done:
+            return True
+        entry = self.entries[seq]
+        if entry["a"] == "move":
+            return os.path.lexists(entry["d"]) and not os.path.lexists(entry["s"])
+        if entry["a"] == "delete":
+            return not os.path.lexists(entry["s"])
+        if entry["a"] == "mkdir":
+            return os.path.isdir(entry["d"])
+        return False
+
+    def _undo_entry(self, entry, in_flight):
+        action, src, dst = entry["a"], entry["s"], entry["d"]
+        if action == "move":
+            if os.path.lexists(dst) and not os.path.lexists(src):
+                os.makedirs(os.path.dirname(src), exist_ok=True)
+                rename_or_move(dst, src)
+                current_stats().detail(f"↩ Moved {os.path.basename(src)} back to {os.path.dirname(src)}",
+                                       "undo move", src=dst, dst=src)
+                return True
+            return False
+        if action == "copy":
+            if in_flight:
+                self._remove_partial(dst)
+            if entry.get("replace"):
+                if not in_flight:
+                    print(f"⚠ {dst} replaced an older file; leaving it in place.")
+                    return False
+                return True  # copies go through a partial file, so dst is still the older file
+            if os.path.lexists(dst):
+                os.remove(dst)
+                current_stats().detail(f"↩ Removed {dst}", "undo copy", dst=dst)
+            return True
+        if action == "delete":
+            print(f"⚠ {src} was deleted and can't be restored.")
+            return False
+        if action == "mkdir":
+            try:
+                os.rmdir(dst)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                return False  # something else was put in it since
+            return True
+        return False
+
+    def undo(self, systems=None):
+        """
+        Reverses this run's changes newest first, touching only the journaled
+        files. Entries an interrupted run started but never confirmed are
+        included. Returns the number of entries undone.
+        """
+        count = 0
+        stats = current_stats()
+        order = sorted(self.entries, reverse=True)
+        for done, seq in enumerate(order, 1):
+            entry = self.entries[seq]
+            if seq in self.undone or (systems is not None and entry.get("sys") not in systems):
+                continue
+            in_flight = seq not in self.done
+            if in_flight and not self.performed(seq) and entry["a"] != "copy":
+                continue
+            try:
+                if self._undo_entry(entry, in_flight):
+                    self.undone.add(seq)
+                    self._write({"undone": seq})
+                    count += 1
+                    stats.count("undone")
+            except OSError as e:
+                stats.end_progress()
+                print(f"❌ Error undoing {entry['a']} of {entry['s'] or entry['d']}: {e}")
+            stats.progress(done, len(order), "undo")
+        remaining = [seq for seq, entry in self.entries.items()
+                     if seq not in self.undone and self.performed(seq) and self._undoable(entry)]
+        if not remaining and self.status != "undone":
+            self.finish("undone")
+        elif self.status is not None and count:
+            self.finish(self.status)  # keep the status as the last line
+        else:
+            self.close()
+        return count
+
+    @staticmethod
+    def _undoable(entry):
+        return entry["a"] in ("move", "mkdir") or (entry["a"] == "copy" and not entry.get("replace"))
+
+    @staticmethod
+    def _remove_partial(dst):
+        """Removes the partial file (or .7z partial folder) a copy to dst left behind."""
+        partial_path = dst + PARTIAL_SUFFIX
+        if os.path.isdir(partial_path):
+            shutil.rmtree(partial_path, ignore_errors=True)
+        elif os.path.lexists(partial_path):
+            os.remove(partial_path)
+        else:
+            return False
+        current_stats().detail(f"↩ Removed {partial_path}", "undo copy", dst=partial_path)
+        return True
+
+    def discard_in_flight(self):
+        """
+        Removes what copies an interrupted run never finished left behind: the
+        partial file, and dst itself only when there was no older file there.
+        """
+        for seq, entry in self.entries.items():
+            if seq in self.done or entry["a"] != "copy":
+                continue
+            if self._remove_partial(entry["d"]):
+                print(f"🗑 Removed partial copy {entry['d'] + PARTIAL_SUFFIX}")
+            if not entry.get("replace") and os.path.lexists(entry["d"]):
+                os.remove(entry["d"])
+                print(f"🗑 Removed partial copy {entry['d']}")
+
+def _journal_line(path, last=False):
+    """The first (or last) record of a journal file without reading the rest; None if it can't be parsed."""
+    try:
+        with open(path, "rb") as f:
+            if last:
+                f.seek(max(0, os.fstat(f.fileno()).st_size - JOURNAL_TAIL_BYTES))
+                lines = f.read().splitlines()
+                line = lines[-1] if lines else b""
+            else:
+                line = f.readline()
+        return json.loads(line.decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def list_journals(op=None, effective_dir=None, statuses=None):
+    """
+    Journals newest first, filtered by operation (from the file name), working
+    folder (first line) and status (last line; None for interrupted runs)
+    before any journal is read in full. A generator, so a caller that stops at
+    the first one it needs doesn't load the rest.
+    """
+    if not os.path.isdir(JOURNAL_DIR):
+        return
+    for name in sorted(os.listdir(JOURNAL_DIR), reverse=True):
+        match = JOURNAL_NAME_RE.match(name)
+        if not match or (op is not None and match.group(1) != op):
+            continue
+        path = os.path.join(JOURNAL_DIR, name)
+        if statuses is not None:
+            last = _journal_line(path, last=True) or {}
+            # Older journals can end with an "undone" record; those are read in full.
+            if "undone" not in last and last.get("status") not in statuses:
+                continue
+        if effective_dir is not None:
+            header = _journal_line(path)
+            if header is None or header.get("args", {}).get("effective_dir") != effective_dir:
+                continue
+        try:
+            journal = Journal.load(path)
+        except OSError:
+            continue
+        if statuses is None or journal.status in statuses:
+            yield journal
+
+def undo_journaled(op, effective_dir, systems=None):
+    """Undoes every finished, not yet undone run of op in effective_dir. Returns entries undone."""
+    total = 0
+    for journal in list_journals(op, effective_dir, ("complete", "resumed")):
+        total += journal.undo(systems)
+    return total
+
+@instrumented("undo")
+def undo_last_operation():
+    """Reverses the most recent finished operation that still has changes on disk."""
+    for journal in list_journals(statuses=("complete", "resumed")):
+        print(f"Undoing '{journal.op}' from {time.ctime(journal.header.get('started', 0))}...")
+        count = journal.undo()
+        print(f"✅ Undid {count} change(s).")
+        return count
+    print("Nothing to undo.")
+    return 0
+
+def resume_journal(journal):
+    """Finishes an interrupted run by running its operation again with the same arguments."""
+    journal.discard_in_flight()
+    journal.finish("resumed")
+    args = dict(journal.args)
+    runner = JOURNAL_RUNNERS.get(journal.op)
+    if runner is None:
+        print(f"Don't know how to resume '{journal.op}'.")
+        return
+    runner(**args)
+
+def recover_interrupted_operations(choice=None):
+    """
+    Looks for journals left by runs that never finished and offers to resume
+    them (re-run with the recorded arguments) or roll them back.
+    """
+    for journal in list_journals(statuses=(None,)):
+        pending = len(journal.entries) - len(journal.done)
+        print(f"\n⚠ '{journal.op}' from {time.ctime(journal.header.get('started', 0))} was interrupted "
+              f"({len(journal.done)} change(s) done, {pending} unconfirmed).")
+        answer = choice or ask("Resume (r), roll back (b) or leave it (anything else)? ").strip().lower()
+        if answer == "r":
+            resume_journal(journal)
+        elif answer == "b":
+            count = journal.undo()
+            if journal.status is None:
+                journal.finish("rolled back")
+            print(f"✅ Rolled back {count} change(s).")
+        else:
+            journal.close()
+
+# -----------------------------
+# File Sorting Functions
+# -----------------------------
+def rename_or_move(src_path, dst_path):
+    """os.rename for the usual same-volume case, shutil.move if that fails (e.g. across devices)."""
+    try:
+        os.rename(src_path, dst_path)
+    except OSError:
+        shutil.move(src_path, dst_path)
+
+def plan_region_sort(files, classifier):
+    """Returns [(filename, folder)] for every file that has a region folder."""
+    plan = []
+    for filename in files:
+        folder = classifier.classify(filename)
+        if folder:
+            plan.append((filename, folder))
+    return plan
+
+@instrumented("sort")
+def sort_files(effective_dir, selected_systems=None):
+    base_roms_dir = effective_dir
+    inventory = get_inventory(effective_dir)
+    classifier = load_master_config().region_classifier()
+    system_dirs = inventory.systems() if selected_systems is None else list(selected_systems)
+    if not system_dirs:
+        print("No system directories found in ROMS.")
+        return
+    journal = Journal.start("sort", effective_dir=effective_dir, selected_systems=selected_systems)
+    try:
+        result = {"systems": len(system_dirs), "moved": 0}
+        stats = current_stats()
+        for system_dir in system_dirs:
+            base_dir = os.path.join(base_roms_dir, system_dir)
+            with stats.phase("scan"):
+                rom_sets = inventory.rom_sets(system_dir)
+                plan = plan_region_sort(rom_sets.mains, classifier)
+            stats.count("files", len(rom_sets.mains))
+            planned = {filename for filename, _ in plan}
+            for main_file in rom_sets.mains:
+                if main_file not in planned:
+                    stats.detail(f"No category found for file: {main_file}", "skip", file=main_file)
+            moved = set()
+            with stats.phase("move"):
+                # Only the folders this plan needs are created.
+                for folder in sorted({folder for _, folder in plan}):
+                    journal.makedirs(os.path.join(base_dir, folder), system_dir)
+                for done, (main_file, folder) in enumerate(plan, 1):
+                    dest_folder = os.path.join(base_dir, folder)
+                    # The whole set moves: CUE/BIN tracks, patches and saves stay next to their game.
+                    for filename in rom_sets.rom_set(main_file):
+                        if filename in moved:
+                            continue
+                        src_path = os.path.join(base_dir, filename)
+                        dst_path = os.path.join(dest_folder, filename)
+                        seq = journal.begin("move", src_path, dst_path, system_dir)
+                        try:
+                            rename_or_move(src_path, dst_path)
+                        except OSError as e:
+                            stats.end_progress()
+                            print(f"❌ Error moving {filename}: {e}")
+                            continue
+                        journal.commit(seq)
+                        moved.add(filename)
+                        result["moved"] += 1
+                        stats.count("moved")
+                        stats.detail(f"Moved {filename} to {dest_folder}", "move", src=src_path, dst=dst_path)
+                    stats.progress(done, len(plan), system_dir)
+            inventory.refresh(system_dir)
+        journal.finish()
+    finally:
+        journal.close()
+    print("File sorting complete.")
+    return result
+
+@instrumented("unsort")
+def unsort_files(effective_dir, selected_systems=None):
+    base_roms_dir = effective_dir
+    inventory = get_inventory(effective_dir)
+    system_dirs = inventory.systems() if selected_systems is None else list(selected_systems)
+    if not system_dirs:
+        print("No system directories found in ROMS.")
+        return
+    category_folders = list(load_master_config().region_classifier().folders) + list(EXTRA_SORT_FOLDERS)
+    # Replay the journaled sorts backwards instead of listing every region folder.
+    stats = current_stats()
+    with stats.phase("move"):
+        undone = undo_journaled("sort", effective_dir, selected_systems)
+    moved_back = 0
+    for system_dir in system_dirs:
+        base_dir = os.path.join(base_roms_dir, system_dir)
+        inventory.refresh(system_dir)
+        present = set(inventory.subdirs(system_dir))
+        for folder in [folder for folder in category_folders if folder in present]:
+            folder_path = os.path.join(base_dir, folder)
+            try:
+                os.rmdir(folder_path)
+                continue
+            except OSError:
+                pass
+            # Files that were put there by hand (or by an older sort) go back too.
+            with stats.phase("move"):
+                for file in os.listdir(folder_path):
+                    rename_or_move(os.path.join(folder_path, file), os.path.join(base_dir, file))
+                    moved_back += 1
+                    stats.count("moved")
+                    stats.detail(f"Moved {file} from {folder_path} back to {base_dir}", "move",
+                                 src=os.path.join(folder_path, file), dst=os.path.join(base_dir, file))
+            os.rmdir(folder_path)
+        inventory.refresh(system_dir)
+    print("File unsorting complete.")
+    return {"systems": len(system_dirs), "undone": undone, "moved": moved_back}
+
+# -----------------------------
+# # Working Directory
+# -----------------------------
+def get_working_folder(target_system):
+    # Removed special mapping; use the target system name directly.
+    return load_master_config().working_folder(target_system)
+
+# -----------------------------
+# Copy Scheduler
+# -----------------------------
+# Copy threads for "Copy files to drive"; 1 copies one file at a time (flaky cards).
+COPY_THREADS = 4
+# Files at or above this size go to the large-file queue (ROMs/ISOs).
+LARGE_FILE_BYTES = 16 * 1024 * 1024
+
+def format_bytes(num_bytes):
+    if num_bytes < 1024:
+        return f"{num_bytes:.0f} B"
+    for unit in ("KB", "MB", "GB", "TB"):
+        num_bytes /= 1024
+        if num_bytes < 1024 or unit == "TB":
+            return f"{num_bytes:.1f} {unit}"
+
+# -----------------------------
+# File Transfer Backend
+# -----------------------------
+# How file contents are moved: "auto" tries copy_file_range, then sendfile, then
+# plain reads and writes ("python"). The kernel calls skip the trip through Python.
+COPY_BACKEND = "auto"
+COPY_BACKENDS = ("auto", "copy_file_range", "sendfile", "python")
+# Bytes per system call / read.
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+# Files are written under this suffix and renamed when complete; a copy that was
+# cut off is picked up from where it stopped the next time.
+PARTIAL_SUFFIX = ".multi tool part"
+# Before resuming, this much of the end of a partial file is compared with the source.
+RESUME_CHECK_BYTES = 1024 * 1024
+# fsync every copied file before it's renamed into place (so a file under its final
+# name is never cut short by a power loss), and each folder once at the end of a copy.
+COPY_FSYNC = True
+
+# Backends the kernel/filesystem refused once; not tried again this run.
+_failed_backends = set()
+
+def _copy_range(src_fd, dst_fd, offset, end):
+    while offset < end:
+        sent = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_BYTES, end - offset), offset, offset)
+        if sent == 0:
+            break
+        offset += sent
+    return offset
+
+def _copy_sendfile(src_fd, dst_fd, offset, end):
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while offset < end:
+        sent = os.sendfile(dst_fd, src_fd, offset, min(COPY_CHUNK_BYTES, end - offset))
+        if sent == 0:
+            break
+        offset += sent
+    return offset
+
+def _copy_python(src_fd, dst_fd, offset, end):
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while offset < end:
+        chunk = os.read(src_fd, min(COPY_CHUNK_BYTES, end - offset))
+        if not chunk:
+            break
+        with memoryview(chunk) as view:
+            written = 0
+            while written < len(chunk):
+                written += os.write(dst_fd, view[written:])
+        offset += len(chunk)
+    return offset
+
+_BACKEND_FUNCTIONS = (("copy_file_range", _copy_range), ("sendfile", _copy_sendfile), ("python", _copy_python))
+
+def copy_contents(src_fd, dst_fd, offset, end, backend=None):
+    """Copies bytes offset..end between two open files with the first backend that works; returns the new offset."""
+    backend = backend or COPY_BACKEND
+    for name, func in _BACKEND_FUNCTIONS:
+        if backend not in ("auto", name) or name in _failed_backends:
+            continue
+        if name == "copy_file_range" and not hasattr(os, "copy_file_range"):
+            continue
+        if name == "sendfile" and (not hasattr(os, "sendfile") or not sys.platform.startswith("linux")):
+            continue  # only Linux can sendfile into a regular file
+        try:
+            return func(src_fd, dst_fd, offset, end)
+        except OSError as e:
+            if name == "python" or e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP,
+                                                   errno.ENOTSUP):
+                raise
+            # Offsets are absolute, so the next backend simply starts over at offset.
+            _failed_backends.add(name)
+    return _copy_python(src_fd, dst_fd, offset, end)
+
+def resume_offset(src_path, partial_path, size):
+    """How much of a partial copy can be kept: its length if its tail matches the source, else 0."""
+    try:
+        have = os.path.getsize(partial_path)
+    except OSError:
+        return 0
+    if have == 0 or have > size:
+        return 0
+    check = min(have, RESUME_CHECK_BYTES)
+    with open(src_path, "rb") as src, open(partial_path, "rb") as partial:
+        src.seek(have - check)
+        partial.seek(have - check)
+        return have if src.read(check) == partial.read(check) else 0
+
+def transfer_file(src_path, dst_path, size=None):
+    """
+    Copies src to dst through a partial file that is renamed into place when
+    complete, so dst is either missing or whole. A partial file left by an
+    earlier run is continued instead of started over. Returns the bytes resumed.
+    """
+    partial_path = dst_path + PARTIAL_SUFFIX
+    size = os.path.getsize(src_path) if size is None else size
+    offset = resume_offset(src_path, partial_path, size)
+    src_fd = os.open(src_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0) | (0 if offset else os.O_TRUNC)
+        dst_fd = os.open(partial_path, flags, 0o666)
+        try:
+            if offset:
+                os.ftruncate(dst_fd, offset)
+            done = copy_contents(src_fd, dst_fd, offset, size)
+            if COPY_FSYNC and done == size:
+                os.fsync(dst_fd)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    if done != size:
+        raise OSError(f"{os.path.basename(src_path)} changed size while copying ({done} of {size} bytes)")
+    try:
+        shutil.copymode(src_path, partial_path)
+    except OSError:
+        pass  # FAT/exFAT cards have no permission bits
+    os.replace(partial_path, dst_path)
+    return offset
+
+def fsync_path(path):
+    """fsync of a file something else wrote (py7zr); opened for writing, as Windows needs."""
+    fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def sync_directories(directories):
+    """
+    Gets the renames onto the drive with one fsync per folder (the files were
+    fsynced before they were renamed).
+    """
+    if sys.platform.startswith("win"):
+        return  # folders can't be opened for fsync on Windows
+    for directory in directories:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+class CopyScheduler:
+    """
+    Bounded thread pool for drive copies. Large files and small files sit in
+    separate queues: a quarter of the threads start on the large queue so a
+    few ISOs keep the bus busy while the rest chew through cover PNGs, and an
+    idle thread steals from the other queue once its own is empty. With one
+    thread everything is copied in submission order on the calling thread.
+    """
+
+    def __init__(self, threads=None, journal=None):
+        self.threads = max(1, COPY_THREADS if threads is None else threads)
+        self.journal = journal
+        self.large = queue.Queue()
+        self.small = queue.Queue()
+        self.jobs = []
+        self.lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.errors = []
+        self.completed = set()
+        self.directories = set()
+        self.stats = current_stats()
+
+    def submit(self, src_file, dest_file, size, system=None, replace=False, member=None):
+        """Queues a copy; with member, src_file is an archive and only that member is extracted to dest_file."""
+        job = (src_file, dest_file, size, system, replace, member)
+        self.jobs.append(job)
+        (self.large if size >= LARGE_FILE_BYTES else self.small).put(job)
+
+    def transfer(self, src_file, dest_file, size):
+        """Copies one file; other backends (FTP) override this."""
+        if transfer_file(src_file, dest_file, size):
+            self.stats.count("resumed")
+        with self.lock:
+            self.directories.add(os.path.dirname(dest_file))
+
+    def extract(self, src_file, member, dest_file):
+        """Decompresses one archive member onto the drive."""
+        extract_member(src_file, member, dest_file)
+        with self.lock:
+            self.directories.add(os.path.dirname(dest_file))
+
+    def _copy(self, job):
+        src_file, dest_file, size, system, replace, member = job
+        filename = member.name if member else os.path.basename(src_file)
+        dest = os.path.dirname(dest_file)
+        seq = self.journal.begin("copy", src_file, dest_file, system, replace=replace) if self.journal else None
+        try:
+            if member is None:
+                self.transfer(src_file, dest_file, size)
+            else:
+                self.extract(src_file, member, dest_file)
+        except Exception as e:
+            with self.lock:
+                self.errors.append((src_file, e))
+            self.stats.end_progress()
+            print(f"❌ Error copying {filename}: {e}")
+            return
+        if seq is not None:
+            self.journal.commit(seq)
+        with self.lock:
+            self.files += 1
+            self.bytes += size
+            self.completed.add(dest_file)
+            done = self.files + len(self.errors)
+        self.stats.count("files")
+        self.stats.count("bytes", size)
+        self.stats.detail(f"✔ Copied {filename} → {dest}", "copy", src=src_file, dst=dest_file, bytes=size)
+        self.stats.progress(done, len(self.jobs), "copied")
+
+    def _worker(self, first, second):
+        for q in (first, second):
+            while True:
+                try:
+                    job = q.get_nowait()
+                except queue.Empty:
+                    break
+                self._copy(job)
+
+    def run(self):
+        """Copies everything submitted and returns (files, bytes, seconds, errors)."""
+        start = time.perf_counter()
+        if self.threads == 1:
+            for job in list(self.jobs):
+                self._copy(job)
+        else:
+            large_threads = max(1, self.threads // 4) if not self.large.empty() else 0
+            workers = []
+            for i in range(self.threads):
+                order = (self.large, self.small) if i < large_threads else (self.small, self.large)
+                worker = threading.Thread(target=self._worker, args=order, daemon=True)
+                worker.start()
+                workers.append(worker)
+            for worker in workers:
+                worker.join()
+        if COPY_FSYNC and self.directories:
+            with self.stats.phase("fsync"):
+                sync_directories(sorted(self.directories))
+            self.directories = set()
+        elapsed = time.perf_counter() - start
+        self.jobs = []
+        self.stats.end_progress()
+        return self.files, self.bytes, elapsed, self.errors
+
+    def report(self, elapsed):
+        rate = self.bytes / elapsed if elapsed > 0 else 0.0
+        files_rate = self.files / elapsed if elapsed > 0 else 0.0
+        print(f"Copied {self.files} files ({format_bytes(self.bytes)}) in {elapsed:.1f}s: "
+              f"{format_bytes(rate)}/s, {files_rate:.1f} files/s with {self.threads} thread(s).")
+        if self.errors:
+            print(f"⚠ {len(self.errors)} file(s) failed to copy.")
+
+# -----------------------------
+# Drive Manifests (Sync Mode)
+# -----------------------------
+# Written into every destination folder on the drive by sync mode.
+DRIVE_MANIFEST_NAME = ".multi tool manifest.json"
+DRIVE_MANIFEST_VERSION = 1
+# Also compare SHA-1 of the local files (catches edits that keep size and mtime).
+SYNC_HASH = False
+
+def file_sha1(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def local_file_entry(path, with_hash=None):
+    """Manifest entry describing a local source file."""
+    st = os.stat(path)
+    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if SYNC_HASH if with_hash is None else with_hash:
+        entry["sha1"] = file_sha1(path)
+    return entry
+
+def manifest_entries_match(old, new):
+    if old is None or old.get("size") != new["size"] or old.get("mtime_ns") != new["mtime_ns"]:
+        return False
+    if "sha1" in old and "sha1" in new:
+        return old["sha1"] == new["sha1"]
+    return True
+
+def load_drive_manifest(dest):
+    """Returns {filename: entry} from a drive folder's manifest, or None when there is none."""
+    try:
+        with open(os.path.join(dest, DRIVE_MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != DRIVE_MANIFEST_VERSION:
+        return None
+    return manifest.get("files", {})
+
+def save_drive_manifest(dest, files):
+    manifest_path = os.path.join(dest, DRIVE_MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": DRIVE_MANIFEST_VERSION, "files": files}, f, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+    except OSError as e:
+        print(f"⚠ Could not write drive manifest in {dest}: {e}")
+
+def bootstrap_drive_manifest(dest, local, drive_names):
+    """
+    First sync of a folder that has no manifest yet: drive files with the same
+    size as the local file are taken as already synced. Anything else on the
+    drive is left alone and never pruned.
+    """
+    files = {}
+    for name in drive_names:
+        entry = local.get(name)
+        if entry is None:
+            continue
+        try:
+            if os.path.getsize(os.path.join(dest, name)) == entry["size"]:
+                files[name] = dict(entry)
+        except OSError:
+            continue
+    return files
+
+# -----------------------------
+# Background Delete
+# -----------------------------
+# Folder at the root of a drive that emptied folders are renamed into.
+TRASH_DIR_NAME = ".multi tool trash"
+DELETE_THREADS = 4
+# Extra attempts for entries that fail (FAT32 cards often refuse a file for a moment).
+DELETE_RETRIES = 3
+DELETE_PROGRESS_SECONDS = 1.0
+
+def move_to_trash(dest, trash_root):
+    """
+    Empties dest by renaming it into trash_root and recreating it. On the same
+    volume that is a single directory update however many files dest holds.
+    Returns (trash path or None, entries emptied, entries left in dest). When
+    dest can't be renamed (in use, or trash_root is on another volume) its
+    entries are renamed one at a time instead; the ones that can't be moved at
+    all are left for the caller to delete in place.
+    """
+    try:
+        entries = os.listdir(dest)
+    except FileNotFoundError:
+        return None, 0, []
+    if not entries:
+        return None, 0, []
+    os.makedirs(trash_root, exist_ok=True)
+    trash = os.path.join(trash_root, f"{os.path.basename(os.path.normpath(dest))} {time.time_ns()}")
+    try:
+        os.rename(dest, trash)
+        os.makedirs(dest, exist_ok=True)
+        return trash, len(entries), []
+    except OSError:
+        pass
+    os.makedirs(trash, exist_ok=True)
+    stuck = []
+    for entry in entries:
+        try:
+            os.rename(os.path.join(dest, entry), os.path.join(trash, entry))
+        except OSError:
+            stuck.append(os.path.join(dest, entry))
+    return trash, len(entries), stuck
+
+class BackgroundDeleter:
+    """
+    Removes trashed folders on a pool of daemon threads while the menu carries
+    on. Every top-level entry is its own job, so a flat boxcovers folder full
+    of covers spreads over all the threads. Entries that fail are retried
+    DELETE_RETRIES times, and whatever still fails is kept for one summary
+    instead of being printed in the middle of other output.
+    """
+
+    def __init__(self, threads=None):
+        self.threads = max(1, DELETE_THREADS if threads is None else threads)
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.done = threading.Condition(self.lock)
+        self.workers = []
+        self.remaining = {}  # trash folder -> entries not finished yet
+        self.pending = 0
+        self.deleted = 0
+        self.failed = []
+        self.start = None
+
+    def submit(self, path, trash=None):
+        with self.lock:
+            if self.pending == 0:
+                self.start = time.perf_counter()
+            self.pending += 1
+            if trash is not None:
+                self.remaining[trash] = self.remaining.get(trash, 0) + 1
+            while len(self.workers) < self.threads:
+                worker = threading.Thread(target=self._worker, daemon=True)
+                worker.start()
+                self.workers.append(worker)
+        self.jobs.put((path, trash, 0))
+
+    def submit_trash(self, trash):
+        """Queues everything inside a trash folder; the folder goes once it's empty."""
+        try:
+            entries = os.listdir(trash)
+        except FileNotFoundError:
+            return 0
+        if not entries:
+            self._remove_empty(trash)
+            return 0
+        for entry in entries:
+            self.submit(os.path.join(trash, entry), trash)
+        return len(entries)
+
+    def submit_leftovers(self, trash_root):
+        """Queues trash left behind by a run that was closed before it finished."""
+        count = 0
+        try:
+            with os.scandir(trash_root) as it:
+                trashes = [entry.path for entry in it if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return 0
+        for trash in trashes:
+            with self.lock:
+                queued = trash in self.remaining
+            if not queued:
+                count += self.submit_trash(trash)
+        return count
+
+    @staticmethod
+    def _remove_empty(trash):
+        for folder in (trash, os.path.dirname(trash)):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                return
+
+    def _delete(self, path):
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+    def _worker(self):
+        while True:
+            path, trash, attempt = self.jobs.get()
+            try:
+                self._delete(path)
+                error = None
+            except FileNotFoundError:
+                error = None
+            except OSError as e:
+                error = e
+            if error is not None and attempt < DELETE_RETRIES:
+                time.sleep(0.1 * (attempt + 1))
+                self.jobs.put((path, trash, attempt + 1))
+                continue
+            with self.lock:
+                if error is None:
+                    self.deleted += 1
+                else:
+                    self.failed.append((path, error))
+                empty = False
+                if trash is not None:
+                    self.remaining[trash] -= 1
+                    if self.remaining[trash] == 0:
+                        del self.remaining[trash]
+                        empty = True
+                self.pending -= 1
+            if empty:
+                self._remove_empty(trash)
+            with self.lock:
+                self.done.notify_all()
+
+    def busy(self):
+        with self.lock:
+            return self.pending > 0
+
+    def wait(self, progress=True):
+        """Blocks until the queue is empty, printing a progress line every DELETE_PROGRESS_SECONDS."""
+        with self.lock:
+            while self.pending > 0:
+                if progress:
+                    print(f"\r🧹 Deleting... {self.deleted} removed, {self.pending} to go", end="", flush=True)
+                self.done.wait(DELETE_PROGRESS_SECONDS)
+        if progress:
+            print()
+
+    def take_summary(self):
+        """Returns (deleted, failed, seconds) since the last summary and starts counting afresh."""
+        with self.lock:
+            elapsed = time.perf_counter() - self.start if self.start is not None else 0.0
+            summary = (self.deleted, self.failed, elapsed)
+            self.deleted, self.failed = 0, []
+            return summary
+
+    def report(self):
+        """Prints the summary of finished work, or how far along the current work is."""
+        if self.busy():
+            with self.lock:
+                print(f"🧹 Still deleting in the background: {self.deleted} removed, {self.pending} to go.")
+            return
+        deleted, failed, elapsed = self.take_summary()
+        if not deleted and not failed:
+            return
+        print(f"🧹 Background delete finished: {deleted} item(s) removed in {elapsed:.1f}s.")
+        if failed:
+            print(f"⚠ {len(failed)} item(s) couldn't be deleted:")
+            for path, error in failed:
+                print(f"   {path}: {error}")
+
+_background_deleter = None
+
+def get_background_deleter():
+    global _background_deleter
+    if _background_deleter is None:
+        _background_deleter = BackgroundDeleter()
+    return _background_deleter
+
+def report_background_deletes():
+    if _background_deleter is not None:
+        _background_deleter.report()
+
+# -----------------------------
+# Drive Capacity Planner
+# -----------------------------
+# Left free on the drive on top of what the copy needs (folder entries, manifests).
+CAPACITY_RESERVE_BYTES = 16 * 1024 * 1024
+
+def is_copied_file(target_system, filename, playlists=False):
+    """
+    Copy to Drive leaves out the tool's own files, and .m3u files for the Wii
+    unless the system has an m3u entry (playlists), i.e. its emulator reads them.
+    """
+    if target_system in ("wii", "Nintendo Wii") and filename.lower().endswith(".m3u") and not playlists:
+        return False
+    return not is_tool_file(filename)
+
+def drive_copy_folders(inventory, system, dest_mapping, target_system):
+    """[(sub, destination)] Copy to Drive fills for a system: games, renamed cover art and multi-disc folders."""
+    folders = []
+    games_key = f"{target_system} games"
+    if games_key in dest_mapping:
+        folders.append((None, dest_mapping[games_key]))
+    renamed_key = f"{target_system} renamed cover art"
+    if inventory.is_dir(system, "renamed cover art") and renamed_key in dest_mapping:
+        folders.append(("renamed cover art", dest_mapping[renamed_key]))
+    # The discs of multi-disc games (the .m3u files go with the games); without a
+    # multi disc entry they go where the m3u entry points from the games folder.
+    disc_key = next((key for key in (f"{target_system} multi disc", "multi disc") if key in dest_mapping), None)
+    if disc_key:
+        dest_discs = dest_mapping[disc_key]
+    elif dest_mapping.get("m3u") and dest_mapping.get(games_key):
+        dest_discs = m3u_disc_folder(dest_mapping[games_key], dest_mapping["m3u"])
+    else:
+        dest_discs = None
+    if dest_discs and inventory.is_dir(system, MULTI_DISC_FOLDER):
+        folders.append((MULTI_DISC_FOLDER, dest_discs))
+        for folder in inventory.subdirs(system, MULTI_DISC_FOLDER):
+            folders.append((os.path.join(MULTI_DISC_FOLDER, folder), os.path.join(dest_discs, folder)))
+    return folders
+
+def on_disk_size(size, cluster=None):
+    """size rounded up to whole clusters (a 1 KB cover still takes 32 KB on a FAT32 card)."""
+    return -(-size // cluster) * cluster if cluster else size
+
+def bytes_needed(inventory, system, folders, target_system, sync=False, cluster=None):
+    """
+    Space a copy of one system would still take on the drive (archives that
+    get extracted count at their unpacked size). Files already there are
+    skipped by a normal copy; with sync a changed file replaces the old one,
+    so only the difference counts.
+    """
+    needed = 0
+    config = load_master_config()
+    extract = extracts_archives(config, system, target_system)
+    playlists = system in config.m3u
+    for sub, dest in folders:
+        try:
+            with os.scandir(dest) as it:
+                existing = {entry.name.lower(): entry for entry in it}
+        except OSError:
+            existing = {}
+        for filename, _, size, _ in copy_sources(inventory, system, sub, extract):
+            if not is_copied_file(target_system, filename, playlists):
+                continue
+            size = on_disk_size(size, cluster)
+            entry = existing.get(filename.lower())
+            if entry is None:
+                needed += size
+            elif sync:
+                try:
+                    needed += max(0, size - on_disk_size(entry.stat().st_size, cluster))
+                except OSError:
+                    needed += size
+    return needed
+
+def pack_systems(needs, free, card_size):
+    """
+    Packs systems onto the drive in use (free bytes) and then onto as many more
+    cards of card_size as it takes, biggest system first, each into the first
+    card with room. Returns ([[systems] per card], [systems too big for any card]).
+    """
+    cards = [[]]
+    room = [free]
+    too_big = []
+    for system in sorted(needs, key=lambda name: (-needs[name], name)):
+        need = needs[system]
+        for index, left in enumerate(room):
+            if need <= left:
+                cards[index].append(system)
+                room[index] -= need
+                break
+        else:
+            if need > card_size:
+                too_big.append(system)
+                continue
+            cards.append([system])
+            room.append(card_size - need)
+    return [sorted(card) for card in cards], too_big
+
+def check_drive_capacity(inventory, mapping, selected_systems, selected_drive, target_system, sync=False, fit=None):
+    """
+    Works out what the selected systems need on the drive before anything is
+    written. Returns the systems to copy: all of them when they fit; when they
+    don't, the ones that fit on this drive if fit is True (or the user says so),
+    otherwise an empty list. Prints the plan for the rest across more cards.
+    """
+    total, free, cluster = drive_space(selected_drive)
+    if free is None:
+        return list(selected_systems)
+    needs = {}
+    for system in selected_systems:
+        if system in mapping:
+            folders = drive_copy_folders(inventory, system, mapping[system], target_system)
+            needs[system] = bytes_needed(inventory, system, folders, target_system, sync, cluster)
+    usable = max(0, free - CAPACITY_RESERVE_BYTES)
+    if sum(needs.values()) <= usable:
+        return list(selected_systems)
+
+    print(f"\n⚠ {format_bytes(sum(needs.values()))} needs to be copied but {selected_drive} only has "
+          f"{format_bytes(usable)} free.")
+    for system in sorted(needs, key=lambda name: -needs[name]):
+        print(f"   {system:<24} {format_bytes(needs[system])}")
+    cards, too_big = pack_systems(needs, usable, max(usable, (total or 0) - CAPACITY_RESERVE_BYTES))
+    for index, card in enumerate(cards, 1):
+        where = "this drive" if index == 1 else f"card {index}"
+        if card:
+            print(f"   {where}: {', '.join(card)} ({format_bytes(sum(needs[system] for system in card))})")
+    if too_big:
+        print(f"   Too big for a card this size: {', '.join(too_big)}")
+    if not cards[0]:
+        print("Nothing selected fits on this drive.")
+        return []
+    if fit is None:
+        fit = INTERACTIVE and ask("Copy only the systems that fit on this drive? (y/n): ").strip().lower() == "y"
+    return cards[0] if fit else []
+
+# -----------------------------
+# Copy Verification
+# -----------------------------
+# Checked after every copy unless asked: "off", "fast" (size and sampled blocks) or "full" (SHA-1 of every byte).
+COPY_VERIFY = "off"
+VERIFY_MODES = ("off", "fast", "full")
+VERIFY_THREADS = 4
+# Fast mode reads this many blocks of VERIFY_BLOCK_BYTES spread over each file (first and last included).
+VERIFY_SAMPLE_BLOCKS = 16
+VERIFY_BLOCK_BYTES = 64 * 1024
+# Files that fail verification are copied again up to this many times.
+VERIFY_RETRIES = 1
+
+def _open_uncached(path):
+    """Opens a copied file so it's read back from the drive, not from the page cache the copy just filled."""
+    f = open(path, "rb")
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+    return f
+
+def choose_verify_mode():
+    """Asks in the menus; batch mode uses COPY_VERIFY."""
+    if not INTERACTIVE:
+        return COPY_VERIFY
+    answer = ask("Verify the copied files? (n = no, f = fast, full = every byte): ").strip().lower()
+    return {"f": "fast", "fast": "fast", "full": "full"}.get(answer, "off")
+
+def sample_offsets(size):
+    if size <= VERIFY_SAMPLE_BLOCKS * VERIFY_BLOCK_BYTES:
+        return [0]  # small enough to read whole
+    last = size - VERIFY_BLOCK_BYTES
+    return sorted({last * i // (VERIFY_SAMPLE_BLOCKS - 1) for i in range(VERIFY_SAMPLE_BLOCKS)})
+
+def sampled_digest(f, size):
+    """SHA-1 of the size and the sampled blocks of an open file."""
+    digest = hashlib.sha1(str(size).encode())
+    offsets = sample_offsets(size)
+    length = size if offsets == [0] else VERIFY_BLOCK_BYTES
+    for offset in offsets:
+        f.seek(offset)
+        digest.update(f.read(length))
+    return digest.hexdigest()
+
+def full_digest(path, uncached=False):
+    digest = hashlib.sha1()
+    with (_open_uncached(path) if uncached else open(path, "rb")) as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def member_matches(path, member):
+    """Whether an extracted file has the size and CRC32 its archive lists (just the size when there's no CRC)."""
+    if os.path.getsize(path) != member.size:
+        return False
+    if member.crc is None:
+        return True
+    crc = 0
+    with _open_uncached(path) as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc == member.crc
+
+def cached_source_hashes(inventory, systems):
+    """Absolute source path -> (size, mtime_ns, sha1) from the ROM hash caches of the systems."""
+    known = {}
+    for system in systems:
+        system_path = inventory.path(system)
+        for rel, entry in load_hash_cache(system_path).items():
+            known[os.path.join(system_path, *rel.split("/"))] = (entry.get("size"), entry.get("mtime_ns"),
+                                                                  entry.get("sha1"))
+    return known
+
+def verify_copies(jobs, mode, threads=None, known_hashes=None):
+    """
+    Compares the copied files (copy scheduler jobs) with their sources on a
+    thread pool. In full mode the source and the copy of a file are hashed as
+    separate tasks so the local disk and the drive are read at the same time,
+    and a source with an up to date entry in known_hashes isn't read at all.
+    Files extracted from an archive are checked in either mode against the
+    size and CRC32 the archive lists for them.
+    Returns (failed jobs, {system: [files, bytes, seconds]}).
+    """
+    stats = current_stats()
+    known_hashes = known_hashes or {}
+    digests = {}
+    per_system = {}
+    failed = []
+
+    def source_digest(src):
+        cached = known_hashes.get(src)
+        if cached and cached[2]:
+            st = os.stat(src)
+            if (st.st_size, st.st_mtime_ns) == tuple(cached[:2]):
+                return cached[2]
+        return full_digest(src)
+
+    def fast(job):
+        src, dst, size, member = job[0], job[1], job[2], job[5]
+        if os.path.getsize(dst) != size:
+            return False
+        if member is not None:
+            return member_matches(dst, member)
+        with open(src, "rb") as a, _open_uncached(dst) as b:
+            return sampled_digest(a, size) == sampled_digest(b, size)
+
+    def timed(func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        return value, start, time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, threads or VERIFY_THREADS)) as pool:
+        futures = {}
+        for index, job in enumerate(jobs):
+            if mode == "full" and job[5] is None:
+                futures[pool.submit(timed, source_digest, job[0])] = (index, "src")
+                futures[pool.submit(timed, full_digest, job[1], True)] = (index, "dst")
+            else:
+                futures[pool.submit(timed, fast, job)] = (index, "fast")
+        for done, future in enumerate(as_completed(futures), 1):
+            index, side = futures[future]
+            job = jobs[index]
+            try:
+                value, start, end = future.result()
+            except OSError as e:
+                value, start, end = None, time.perf_counter(), time.perf_counter()
+                stats.detail(f"❌ Could not read {e.filename}: {e.strerror}", "verify", file=e.filename)
+            record = digests.setdefault(index, {"start": start, "end": end})
+            record["start"], record["end"] = min(record["start"], start), max(record["end"], end)
+            record[side] = value
+            stats.progress(done, len(futures), "verified")
+            if side != "fast" and ("src" not in record or "dst" not in record):
+                continue
+            ok = record["fast"] if side == "fast" else record["src"] is not None and record["src"] == record["dst"]
+            system = job[3]
+            files, size, first, last = per_system.get(system, (0, 0, record["start"], record["end"]))
+            per_system[system] = (files + 1, size + job[2], min(first, record["start"]), max(last, record["end"]))
+            stats.count("verified")
+            if not ok:
+                failed.append(job)
+                stats.count("mismatched")
+                stats.detail(f"✖ {os.path.basename(job[1])} doesn't match its source", "mismatch",
+                             src=job[0], dst=job[1])
+    stats.end_progress()
+    return failed, {system: [files, size, last - first] for system, (files, size, first, last) in per_system.items()}
+
+def report_verification(mode, per_system, failed):
+    for system in sorted(per_system, key=str):
+        files, size, seconds = per_system[system]
+        rate = size / seconds if seconds > 0 else 0.0
+        print(f"   {system}: {files} file(s), {format_bytes(size)} verified ({mode}) in {seconds:.1f}s, "
+              f"{format_bytes(rate)}/s")
+    if failed:
+        print(f"⚠ {len(failed)} file(s) on the drive don't match the originals.")
+
+# -----------------------------
+# Run Copy to Drive
+# -----------------------------
+@instrumented("copy")
+def run_copy_to_drive(target_system, effective_dir, selected_systems=None, threads=None, sync=None, prune=None,
+                      selected_drive=None, fit=None, verify=None):
+    """
+    Copies files to a selected drive based on paths in Master.txt.
+    Fix: Now filters systems based on local ROMS folder instead of the destination drive.
+    """
+
+    # Step 1: Select a Drive
+    if selected_drive is None:
+        selected_drive = select_drive("copy to", "Copy to Drive")
+        if selected_drive is None:
+            return
 
     # Step 2: Parse Master.txt for destination mappings using the selected drive
     mapping = parse_master_drive(selected_drive)
 
     # Step 3: Filter systems based on **local ROMS directory** (not the destination drive)
+    inventory = get_inventory(effective_dir)
     valid_systems = []
-    for system in os.listdir(effective_dir):  # List only local systems
-        system_path = os.path.join(effective_dir, system)
-        if not os.path.isdir(system_path):
-            continue  # Skip if it's not a directory
-
-        # Paths to check
-        games_path = system_path
-        cover_art_path = os.path.join(system_path, "renamed cover art")
-
-        # Check if both exist and have files
-        if os.path.exists(games_path) and os.path.exists(cover_art_path):
-            if os.listdir(games_path) and os.listdir(cover_art_path):  # Ensure both have files
-                valid_systems.append(system)
+    for system in inventory.systems():  # List only local systems
+        # Check that both the games and renamed cover art folders have files
+        if inventory.has_files(system) and inventory.has_files(system, "renamed cover art"):
+            valid_systems.append(system)
 
     valid_systems.sort()  # Ensure consistent order
 
@@ -297,80 +3142,717 @@ def run_copy_to_drive(target_system, effective_dir, selected_systems=None):
     valid_systems.append("All Systems") if len(valid_systems) > 1 else None
 
     # Step 4: Select systems for copy
-    selected_systems = get_multiple_selections(valid_systems, "\nSelect system(s) for Copy to Drive:")
-    
     if selected_systems is None:
-        print("Cancelling Copy to Drive...")
-        return
-    
+        selected_systems = get_multiple_selections(valid_systems, "\nSelect system(s) for Copy to Drive:")
+
+        if selected_systems is None:
+            print("Cancelling Copy to Drive...")
+            return
+
     if "All Systems" in selected_systems:
-        selected_systems = valid_systems[:-1]  # Remove "All Systems" and select all actual systems
+        selected_systems = [system for system in valid_systems if system != "All Systems"]
+
+    if sync is None:
+        sync = ask("Sync mode (copy new and changed files using the drive manifest)? (y/n): ").strip().lower() == "y"
+    if sync and prune is None:
+        prune = ask("Delete files from the drive that are no longer in your ROMS folder? (y/n): ").strip().lower() == "y"
+    if verify is None:
+        verify = choose_verify_mode()
+
+    # Step 5: Check that it fits before the first byte is written
+    stats = current_stats()
+    with stats.phase("plan"):
+        fitting = check_drive_capacity(inventory, mapping, selected_systems, selected_drive, target_system, sync, fit)
+    if not fitting:
+        print("Cancelling Copy to Drive...")
+        return {"systems": list(selected_systems), "drive": selected_drive, "files": 0, "bytes": 0,
+                "refused": "not enough space", "errors": 1}
+    selected_systems = fitting
 
     print(f"Running Copy files to Drive for target '{target_system}' on the following systems:")
 
-    def copy_files(src, dest):
-        """ Copies files from source to destination. """
-        if not os.path.exists(dest):
-            os.makedirs(dest)
-        for filename in os.listdir(src):
-            if target_system == "Nintendo Wii" and filename.lower().endswith(".m3u"):
-                print(f"Skipping {filename} (M3U file)")
-                continue
-            src_file = os.path.join(src, filename)
-            dest_file = os.path.join(dest, filename)
-            if os.path.isfile(src_file):
-                if os.path.exists(dest_file):
-                    print(f"✔ {filename} already exists in {dest}; skipping.")
+    journal = Journal.start("copy", target_system=target_system, effective_dir=effective_dir,
+                            selected_systems=list(selected_systems), threads=threads, sync=sync, prune=prune,
+                            selected_drive=selected_drive)
+    try:
+        scheduler = CopyScheduler(threads, journal)
+        synced = {}
+        # Systems whose archives are unpacked onto the drive instead of copied whole.
+        config = load_master_config()
+        extracts = {system: extracts_archives(config, system, target_system) for system in selected_systems}
+
+        def wanted(system, filename):
+            if is_copied_file(target_system, filename, system in config.m3u):
+                return True
+            if not is_tool_file(filename):
+                stats.detail(f"Skipping {filename} (M3U file)", "skip", file=filename)
+            return False
+
+        def copy_files(system, sub, dest):
+            """ Queues files from ROMS\\<system>[\\<sub>] to destination on the copy scheduler. """
+            journal.makedirs(dest, system)
+            # One listing of the destination instead of a stat per file; names that
+            # only differ in case still get a real exists() check (FAT is case-insensitive).
+            existing = set(os.listdir(dest))
+            existing_lower = {name.lower() for name in existing}
+            for filename, src_file, size, member in copy_sources(inventory, system, sub, extracts[system]):
+                if not wanted(system, filename):
                     continue
-                try:
-                    shutil.copy(src_file, dest_file)
-                    print(f"✔ Copied {filename} → {dest}")
-                except Exception as e:
-                    print(f"❌ Error copying {filename}: {e}")
+                dest_file = os.path.join(dest, filename)
+                if filename in existing or (filename.lower() in existing_lower and os.path.exists(dest_file)):
+                    stats.detail(f"✔ {filename} already exists in {dest}; skipping.", "skip", file=dest_file)
+                    stats.count("skipped")
+                    continue
+                scheduler.submit(src_file, dest_file, size, system, member=member)
 
-    # Step 5: Process each selected system
-    for system in selected_systems:
-        if system not in mapping:
-            print(f"No destination mapping found for system '{system}' in Master.txt.")
-            continue
+        def sync_files(system, sub, dest):
+            """ Queues new/changed files and optionally prunes stale ones, using the drive manifest. """
+            journal.makedirs(dest, system)
+            local = {}
+            sources = {}
+            for filename, src_file, size, member in copy_sources(inventory, system, sub, extracts[system]):
+                if wanted(system, filename):
+                    # An extracted member is as new as its archive.
+                    local[filename] = (local_file_entry(src_file) if member is None else
+                                       dict(local_file_entry(src_file, False), size=size))
+                    sources[filename] = (src_file, member)
+            manifest = load_drive_manifest(dest)
+            drive_names = ()
+            if manifest is None:
+                drive_names = set(os.listdir(dest))
+                manifest = bootstrap_drive_manifest(dest, local, drive_names)
+            pending = []
+            for filename, entry in local.items():
+                if manifest_entries_match(manifest.get(filename), entry):
+                    stats.detail(f"✔ {filename} is up to date in {dest}; skipping.", "skip", file=filename, dest=dest)
+                    stats.count("skipped")
+                    continue
+                dest_file = os.path.join(dest, filename)
+                src_file, member = sources[filename]
+                scheduler.submit(src_file, dest_file, entry["size"], system,
+                                 replace=filename in manifest or filename in drive_names, member=member)
+                pending.append((filename, entry))
+            for filename in [name for name in manifest if name not in local]:
+                if not prune:
+                    continue
+                seq = journal.begin("delete", os.path.join(dest, filename), None, system)
+                try:
+                    os.remove(os.path.join(dest, filename))
+                    stats.count("pruned")
+                    stats.detail(f"🗑 Removed {filename} from {dest} (no longer in ROMS)", "delete",
+                                 file=os.path.join(dest, filename))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"⚠ Error removing {filename} from {dest}: {e}")
+                    continue
+                journal.commit(seq)
+                del manifest[filename]
+            synced[dest] = (manifest, pending)
 
-        dest_mapping = mapping[system]
-        print(f"  - {system}")
-        src_folder = os.path.join(effective_dir, system)
+        # Step 6: Process each selected system (games, renamed cover art, multi-disc folders)
+        unmapped = []
+        for system in selected_systems:
+            folders = drive_copy_folders(inventory, system, mapping[system], target_system) if system in mapping else []
+            if not folders:
+                print(f"No destination mapping found for system '{system}' in Master.txt.")
+                unmapped.append(system)
+                continue
 
-        # Copy game files
-        games_key = f"{target_system} games"
-        if games_key in dest_mapping:
-            dest_games = dest_mapping[games_key]
-            copy_files(src_folder, dest_games)
+            print(f"  - {system}")
+            with stats.phase("scan"):
+                for sub, dest in folders:
+                    (sync_files if sync else copy_files)(system, sub, dest)
 
-        # Copy renamed cover art
-        renamed_key = f"{target_system} renamed cover art"
-        renamed_src = os.path.join(src_folder, "renamed cover art")
-        if os.path.isdir(renamed_src) and renamed_key in dest_mapping:
-            dest_renamed = dest_mapping[renamed_key]
-            copy_files(renamed_src, dest_renamed)
+        jobs = list(scheduler.jobs)
+        with stats.phase("copy"):
+            files, copied_bytes, elapsed, errors = scheduler.run()
+        scheduler.report(elapsed)
+        result = {"systems": list(selected_systems), "drive": selected_drive, "files": files, "bytes": copied_bytes,
+                  "seconds": round(elapsed, 3), "errors": len(errors), "unmapped": unmapped}
 
+        # Step 7: Read the copies back; ones that don't match are copied again
+        if verify in ("fast", "full") and files:
+            print(f"Verifying {files} copied file(s)...")
+            known = cached_source_hashes(inventory, selected_systems) if verify == "full" else {}
+            pending = [job for job in jobs if job[1] in scheduler.completed]
+            result["verified"] = len(pending)
+            result["recopied"] = 0
+            mismatched = []
+            for attempt in range(VERIFY_RETRIES + 1):
+                with stats.phase("verify"):
+                    failed, per_system = verify_copies(pending, verify, threads, known)
+                report_verification(verify, per_system, failed)
+                if not failed:
+                    break
+                for job in failed:
+                    scheduler.completed.discard(job[1])
+                if attempt == VERIFY_RETRIES:
+                    mismatched.extend(failed)
+                    break
+                print(f"Copying {len(failed)} file(s) again...")
+                for job in failed:
+                    scheduler.submit(*job)
+                with stats.phase("copy"):
+                    scheduler.run()
+                result["recopied"] += len(failed)
+                pending = [job for job in failed if job[1] in scheduler.completed]
+                # A re-copy that failed still leaves the bad copy behind.
+                mismatched.extend(job for job in failed if job[1] not in scheduler.completed)
+            if mismatched:
+                # Leave nothing that a later copy would skip as already there.
+                for job in mismatched:
+                    try:
+                        os.remove(job[1])
+                    except OSError:
+                        pass
+                result["errors"] += len(mismatched)
+                result["mismatched"] = [job[1] for job in mismatched]
+        for dest, (manifest, pending) in synced.items():
+            for filename, entry in pending:
+                if os.path.join(dest, filename) in scheduler.completed:
+                    manifest[filename] = entry
+            save_drive_manifest(dest, manifest)
+        journal.finish()
+    finally:
+        journal.close()
     print("✅ Copy operation complete.")
-    time.sleep(1)
+    pause(1)
+    return result
 
 
-def run_ftp_transfer(selected_systems, target_system, effective_dir):
-    print(f"Running FTP Transfer for target '{target_system}' on the following systems:")
-    for system in selected_systems:
-        print(f"  - {system}")
-    time.sleep(1)
+# -----------------------------
+# FTP Transfer
+# -----------------------------
+FTP_PORT = 21
+FTP_USER = "anonymous"
+FTP_PASSWORD = ""
+FTP_TIMEOUT = 30
+# Connections kept open to the console; each one uploads a file at a time.
+FTP_CONNECTIONS = 3
+# Extra attempts per file after a dropped connection; uploads resume where they stopped.
+FTP_RETRIES = 2
+
+def ftp_remote_path(path):
+    """Master.txt destination (with an empty drive) -> absolute POSIX path on the FTP server."""
+    return posixpath.normpath("/" + path.replace("\\", "/").lstrip("/"))
+
+def parse_ftp_list_line(line):
+    """(name, size, is_dir) from a Unix-style LIST line, or None for anything else."""
+    parts = line.split(None, 8)
+    if len(parts) < 9 or parts[0][:1] not in ("d", "-", "l"):
+        return None
+    try:
+        size = int(parts[4])
+    except ValueError:
+        size = None
+    return parts[8], size, parts[0].startswith("d")
+
+class FtpPool:
+    """
+    A few persistent, logged-in FTP connections shared by the upload threads,
+    plus a cache of remote folder listings so skip-if-exists checks don't cost
+    a round trip per file.
+    """
+
+    def __init__(self, host, port=None, user=None, password=None, size=None):
+        self.host = host
+        self.port = port or FTP_PORT
+        self.user = user or FTP_USER
+        self.password = FTP_PASSWORD if password is None else password
+        self.size = max(1, size or FTP_CONNECTIONS)
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.listings = {}
+        self.open_connections = 0
+
+    def _connect(self):
+        ftp = ftplib.FTP()
+        ftp.connect(self.host, self.port, timeout=FTP_TIMEOUT)
+        ftp.login(self.user, self.password)
+        ftp.set_pasv(True)
+        ftp.voidcmd("TYPE I")
+        return ftp
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrows a connection; one that fails is closed instead of being handed out again."""
+        try:
+            ftp = self.idle.get_nowait()
+        except queue.Empty:
+            ftp = self._connect()
+            with self.lock:
+                self.open_connections += 1
+        try:
+            yield ftp
+        except BaseException:
+            self._discard(ftp)
+            raise
+        self.idle.put(ftp)
+
+    def _discard(self, ftp):
+        with self.lock:
+            self.open_connections -= 1
+        try:
+            ftp.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                ftp = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                ftp.quit()
+            except ftplib.all_errors:
+                ftp.close()
+        self.open_connections = 0
+
+    def listing(self, path):
+        """{name: (size, is_dir)} of a remote folder ({} if it doesn't exist), listed once."""
+        with self.lock:
+            cached = self.listings.get(path)
+        if cached is not None:
+            return cached
+        entries = {}
+        with self.connection() as ftp:
+            try:
+                for name, facts in ftp.mlsd(path, facts=["type", "size"]):
+                    if name in (".", "..") or facts.get("type") in ("cdir", "pdir"):
+                        continue
+                    size = facts.get("size")
+                    entries[name] = (int(size) if size is not None else None, facts.get("type") == "dir")
+            except ftplib.error_perm as e:
+                if str(e)[:3] in ("500", "502"):  # no MLSD on this server; parse LIST instead
+                    lines = []
+                    try:
+                        ftp.retrlines(f"LIST {path}", lines.append)
+                    except ftplib.error_perm:
+                        lines = []  # missing folder
+                    for line in lines:
+                        parsed = parse_ftp_list_line(line)
+                        if parsed is not None:
+                            entries[parsed[0]] = parsed[1:]
+        with self.lock:
+            self.listings[path] = entries
+        return entries
+
+    def makedirs(self, path):
+        """Creates path and any missing parents, using the listing cache to skip existing ones."""
+        parent = "/"
+        for part in [part for part in path.split("/") if part]:
+            current = posixpath.join(parent, part)
+            if part not in self.listing(parent):
+                with self.connection() as ftp:
+                    try:
+                        ftp.mkd(current)
+                    except ftplib.error_perm:
+                        pass  # created by another thread, or the server hides it from listings
+                with self.lock:
+                    self.listings[parent][part] = (None, True)
+                    self.listings.setdefault(current, {})
+            parent = current
+
+    def read_manifest(self, folder):
+        """{filename: entry} from the drive manifest in a remote folder, or None when there is none."""
+        if DRIVE_MANIFEST_NAME not in self.listing(folder):
+            return None
+        data = io.BytesIO()
+        try:
+            with self.connection() as ftp:
+                ftp.retrbinary(f"RETR {posixpath.join(folder, DRIVE_MANIFEST_NAME)}", data.write)
+            manifest = json.loads(data.getvalue().decode("utf-8"))
+        except (ftplib.error_perm, ValueError):
+            return None
+        if manifest.get("version") != DRIVE_MANIFEST_VERSION:
+            return None
+        return manifest.get("files", {})
+
+    def write_manifest(self, folder, files):
+        """Uploads the drive manifest of a remote folder (the same file sync mode keeps on a drive)."""
+        data = json.dumps({"version": DRIVE_MANIFEST_VERSION, "files": files}, ensure_ascii=False).encode("utf-8")
+        try:
+            with self.connection() as ftp:
+                ftp.storbinary(f"STOR {posixpath.join(folder, DRIVE_MANIFEST_NAME)}", io.BytesIO(data))
+        except ftplib.error_perm as e:
+            print(f"⚠ Could not write drive manifest in {folder}: {e}")
+            return
+        with self.lock:
+            self.listings.setdefault(folder, {})[DRIVE_MANIFEST_NAME] = (len(data), False)
+
+    def remote_size(self, path):
+        folder, name = posixpath.split(path)
+        entry = self.listing(folder).get(name)
+        return entry[0] if entry is not None and not entry[1] else None
+
+    def upload(self, local_path, remote_path, size):
+        """
+        STORs a file under its name plus PARTIAL_SUFFIX and renames it into
+        place when complete, so only an upload this tool left unfinished is
+        ever continued with REST (never an older file with the same name).
+        Retries FTP_RETRIES times on a fresh connection, asking the server how
+        far the last attempt got. Returns the bytes resumed.
+        """
+        folder, name = posixpath.split(remote_path)
+        partial_path = remote_path + PARTIAL_SUFFIX
+        offset = self.remote_size(partial_path) or 0
+        if offset > size:
+            offset = 0
+        resumed = offset
+        for attempt in range(FTP_RETRIES + 1):
+            try:
+                with self.connection() as ftp, open(local_path, "rb") as f:
+                    if attempt:
+                        try:
+                            offset = ftp.size(partial_path) or 0
+                        except ftplib.error_perm:
+                            offset = 0
+                        if offset > size:
+                            offset = 0
+                    f.seek(offset)
+                    ftp.storbinary(f"STOR {partial_path}", f, blocksize=256 * 1024, rest=offset or None)
+                    try:
+                        ftp.rename(partial_path, remote_path)
+                    except ftplib.error_perm:
+                        ftp.delete(remote_path)  # servers that won't rename over an existing file
+                        ftp.rename(partial_path, remote_path)
+                break
+            except (OSError, EOFError, ftplib.error_temp, ftplib.error_reply):
+                if attempt == FTP_RETRIES:
+                    raise
+        with self.lock:
+            entries = self.listings.setdefault(folder, {})
+            entries.pop(name + PARTIAL_SUFFIX, None)
+            entries[name] = (size, False)
+        return resumed
+
+class FtpUploadScheduler(CopyScheduler):
+    """CopyScheduler whose threads upload over an FtpPool (one thread per connection)."""
+
+    def __init__(self, pool):
+        super().__init__(pool.size)
+        self.pool = pool
+        self.resumed = 0
+
+    def transfer(self, src_file, dest_file, size):
+        if self.pool.upload(src_file, dest_file, size):
+            with self.lock:
+                self.resumed += 1
+
+@instrumented("ftp")
+def run_ftp_transfer(target_system, effective_dir, selected_systems=None, host=None, port=None, user=None,
+                     password=None, connections=None):
+    """
+    Uploads games, renamed cover art and multi-disc folders to a console's FTP
+    server. The destinations are the same Master.txt paths as Copy to Drive,
+    with the server's root standing in for the drive. A file is skipped when
+    it's there at full size and the drive manifest in its folder (as in sync
+    mode) says it came from the local file as it is now; partial uploads are
+    resumed.
+    """
+    inventory = get_inventory(effective_dir)
+    valid_systems = sorted(system for system in inventory.systems()
+                           if inventory.has_files(system) and inventory.has_files(system, "renamed cover art"))
+    if not valid_systems:
+        print("\nNo systems found with both games and renamed cover art in ROMS. Exiting FTP Transfer...")
+        return
+    if len(valid_systems) > 1:
+        valid_systems.append("All Systems")
+    if selected_systems is None:
+        selected_systems = get_multiple_selections(valid_systems, "\nSelect system(s) for FTP Transfer:")
+        if selected_systems is None:
+            print("Cancelling FTP Transfer...")
+            return
+    if "All Systems" in selected_systems:
+        selected_systems = [system for system in valid_systems if system != "All Systems"]
+    if host is None:
+        host = ask("Enter the console's FTP address (ie. 192.168.1.20 or 192.168.1.20:5000): ").strip()
+        if not host:
+            print("Cancelling FTP Transfer...")
+            return
+    if ":" in host and port is None:
+        host, port = host.rsplit(":", 1)
+        port = int(port)
+
+    mapping = parse_master_drive("")
+    config = load_master_config()
+    pool = FtpPool(host, port, user, password, connections)
+    scheduler = FtpUploadScheduler(pool)
+    stats = current_stats()
+    skipped = 0
+    unmapped = []
+    manifests = {}
+    print(f"Running FTP Transfer for target '{target_system}' to {host} on the following systems:")
+    try:
+        with stats.phase("scan"):
+            for system in selected_systems:
+                dest_mapping = mapping.get(system)
+                if dest_mapping is None or f"{target_system} games" not in dest_mapping:
+                    print(f"No destination mapping found for system '{system}' in Master.txt.")
+                    unmapped.append(system)
+                    continue
+                print(f"  - {system}")
+                for sub, dest in drive_copy_folders(inventory, system, dest_mapping, target_system):
+                    if not dest:
+                        continue
+                    remote = ftp_remote_path(dest)
+                    pool.makedirs(remote)
+                    existing = pool.listing(remote)
+                    local = {filename: local_file_entry(os.path.join(inventory.path(system, sub), filename))
+                             for filename in inventory.files(system, sub)
+                             if is_copied_file(target_system, filename, system in config.m3u)}
+                    manifest = pool.read_manifest(remote)
+                    bootstrapped = manifest is None
+                    if bootstrapped:
+                        # Like a first sync: files already there at the same size count as uploaded.
+                        manifest = {filename: dict(entry) for filename, entry in local.items()
+                                    if existing.get(filename, (None,))[0] == entry["size"]}
+                    pending = []
+                    for filename, entry in local.items():
+                        remote_entry = existing.get(filename)
+                        if (remote_entry is not None and remote_entry[0] == entry["size"]
+                                and manifest_entries_match(manifest.get(filename), entry)):
+                            skipped += 1
+                            stats.detail(f"✔ {filename} is up to date in {remote}; skipping.", "skip",
+                                         file=posixpath.join(remote, filename))
+                            continue
+                        scheduler.submit(os.path.join(inventory.path(system, sub), filename),
+                                         posixpath.join(remote, filename), entry["size"], system)
+                        pending.append((filename, entry))
+                    if pending or bootstrapped:
+                        manifests[remote] = (manifest, pending)
+        with stats.phase("copy"):
+            files, sent, elapsed, errors = scheduler.run()
+        for remote, (manifest, pending) in manifests.items():
+            for filename, entry in pending:
+                if posixpath.join(remote, filename) in scheduler.completed:
+                    manifest[filename] = entry
+            pool.write_manifest(remote, manifest)
+    except (OSError, EOFError, ftplib.all_errors) as e:
+        print(f"❌ FTP error talking to {host}: {e}")
+        return {"systems": list(selected_systems), "host": host, "files": 0, "bytes": 0, "resumed": 0,
+                "skipped": skipped, "errors": 1, "unmapped": unmapped}
+    finally:
+        pool.close()
+    scheduler.report(elapsed)
+    if scheduler.resumed:
+        print(f"↪ {scheduler.resumed} partial upload(s) resumed.")
+    print("✅ FTP Transfer complete.")
+    pause(1)
+    return {"systems": list(selected_systems), "host": host, "files": files, "bytes": sent,
+            "resumed": scheduler.resumed, "skipped": skipped, "seconds": round(elapsed, 3), "errors": len(errors),
+            "unmapped": unmapped}
+
+# -----------------------------
+# Multi-Disc Games (M3U)
+# -----------------------------
+# Discs of multi-disc games move into this folder inside ROMS\<system>; the .m3u
+# stays with the other games. Copy to Drive puts the folder at the "multi disc" entry, or
+# where the "m3u" entry points from the games folder when there is none.
+MULTI_DISC_FOLDER = "multi disc"
+# "(Disc 1)", "(Disk 2 of 3)", "(CD B)"...
+DISC_TAG_RE = re.compile(r"\s*\((?:disc|disk|cd)\s*([0-9]+|[a-z])(?:\s*of\s*([0-9]+))?\)", re.IGNORECASE)
+# When a disc has one of these, only it goes in the playlist (not its .bin tracks).
+DISC_SHEET_EXTENSIONS = (".cue", ".gdi", ".ccd", ".mds")
+# Stands for the game's title in the m3u entry of Master.txt (one folder per game).
+M3U_TITLE_PLACEHOLDER = "game name"
+
+def disc_number(tag):
+    return int(tag) if tag.isdigit() else ord(tag.lower()) - ord("a") + 1
+
+def group_disc_sets(filenames, names=None):
+    """
+    Groups disc files by title in one pass over a listing. Returns
+    {title key: {"title", "discs": {number: [filenames]}, "total"}} where the
+    title is the file name without its disc/track tags and extension. names
+    can give a file another name to go by (the game inside an archive).
+    """
+    names = names or {}
+    sets = {}
+    for filename in filenames:
+        stem = os.path.splitext(names.get(filename, filename))[0]
+        match = DISC_TAG_RE.search(stem)
+        if not match:
+            continue
+        title = " ".join(TRACK_TAG_RE.sub("", DISC_TAG_RE.sub("", stem, count=1)).split())
+        disc_set = sets.setdefault(title.lower(), {"title": title, "discs": {}, "total": None})
+        disc_set["discs"].setdefault(disc_number(match.group(1)), []).append(filename)
+        if match.group(2):
+            disc_set["total"] = int(match.group(2))
+    return sets
+
+def has_multi_disc_entry(config, system):
+    """Systems with an m3u entry, or a multi disc location on the drive, get playlists."""
+    settings = config.aliases.get(system, {})
+    return system in config.m3u or any(key.endswith("multi disc") for key in settings)
+
+def m3u_disc_folder(games_dest, m3u_path):
+    """
+    Where on the drive the paths in a playlist lead: the m3u entry (up to
+    "game name") resolved from the games folder the playlist is copied to.
+    """
+    rel = m3u_path.replace("\\", "/").split(M3U_TITLE_PLACEHOLDER, 1)[0]
+    return os.path.normpath(os.path.join(games_dest, *[part for part in rel.split("/") if part]))
+
+def multi_disc_conflicts(config, system):
+    """[(multi disc key, its location, where the m3u entry points)] for targets where the two differ."""
+    settings = config.drive_view("").get(system, {})
+    m3u_path = settings.get("m3u")
+    conflicts = []
+    if not m3u_path:
+        return conflicts
+    for key, games_dest in settings.items():
+        if not key.endswith(" games") or not games_dest:
+            continue
+        target = key[:-len(" games")]
+        disc_key = next((k for k in (f"{target} multi disc", "multi disc") if settings.get(k)), None)
+        if disc_key is None:
+            continue
+        pointed = m3u_disc_folder(games_dest, m3u_path)
+        if os.path.normcase(os.path.normpath(settings[disc_key])) != os.path.normcase(pointed):
+            conflicts.append((disc_key, settings[disc_key], pointed))
+    return conflicts
+
+def playlist_entries(disc_set, prefix, names=None):
+    """The lines of a game's .m3u: one per disc, in disc order, under prefix (by their names in names, if any)."""
+    names = names or {}
+    lines = []
+    for number in sorted(disc_set["discs"]):
+        files = sorted(names.get(f, f) for f in disc_set["discs"][number])
+        sheets = [f for f in files if f.lower().endswith(DISC_SHEET_EXTENSIONS)]
+        listed = sheets or [f for f in files if not f.lower().endswith((".ips", ".bps"))] or files
+        lines.extend(f"{prefix}/{f}" if prefix else f for f in listed)
+    return lines
+
+@instrumented("m3u")
+def run_multi_disc_games(effective_dir, selected_systems=None):
+    """
+    Creates an .m3u for every game with more than one disc and moves its discs
+    into ROMS\\<system>\\multi disc. The playlist entries use the relative path
+    from the system's m3u entry in Master.txt (just the file names when it only
+    has a multi disc location, ie. discs next to the games). Discs already moved and
+    playlists already up to date are left alone, so running it again only
+    picks up new games.
+    """
+    config = load_master_config()
+    inventory = get_inventory(effective_dir)
+    systems = sorted(system for system in inventory.systems() if has_multi_disc_entry(config, system))
+    if not systems:
+        print("No systems with an 'm3u' or 'multi disc' entry in Master.txt were found in ROMS.")
+        return
+    if selected_systems is None:
+        if len(systems) > 1:
+            systems.append("All Systems")
+        selected_systems = get_multiple_selections(systems, "\nSelect system(s) for M3U creation:")
+        if selected_systems is None:
+            print("Cancelling M3U creation...")
+            return
+    if "All Systems" in selected_systems:
+        selected_systems = [system for system in systems if system != "All Systems"]
 
-def run_multi_disc_games(selected_systems):
     print("Running M3U creation on the following systems:")
-    for system in selected_systems:
-        print(f"  - {system}")
-    time.sleep(1)
+    journal = Journal.start("m3u", effective_dir=effective_dir, selected_systems=list(selected_systems))
+    try:
+        result = {"systems": list(selected_systems), "games": 0, "playlists": 0, "moved": 0}
+        stats = current_stats()
+        for system in selected_systems:
+            if not has_multi_disc_entry(config, system):
+                print(f"No m3u or multi disc entry for '{system}' in Master.txt; skipping.")
+                continue
+            m3u_path = config.m3u.get(system, "")
+            print(f"  - {system}")
+            for disc_key, disc_dest, pointed in multi_disc_conflicts(config, system):
+                print(f"⚠ {system}: '{disc_key}' copies the discs to {disc_dest}, but the m3u entry points at "
+                      f"{pointed}. The playlists won't find their discs until one of them is changed in Master.txt.")
+            per_game = M3U_TITLE_PLACEHOLDER in m3u_path
+            system_path = inventory.path(system)
+            disc_root = os.path.join(system_path, MULTI_DISC_FOLDER)
+
+            # One listing each of the system folder and the discs moved on earlier runs.
+            with stats.phase("scan"):
+                locations = {filename: system_path for filename in inventory.files(system)}
+                if inventory.is_dir(system, MULTI_DISC_FOLDER):
+                    for filename in inventory.files(system, MULTI_DISC_FOLDER):
+                        locations.setdefault(filename, disc_root)
+                    for folder in inventory.subdirs(system, MULTI_DISC_FOLDER):
+                        for filename in inventory.files(system, os.path.join(MULTI_DISC_FOLDER, folder)):
+                            locations.setdefault(filename, os.path.join(disc_root, folder))
+                # Zipped discs are grouped by the disc inside; the playlist lists that
+                # name when the archives get extracted onto the drive.
+                names = {}
+                for filename, folder in locations.items():
+                    if not is_archive(filename):
+                        continue
+                    member = main_member(archive_members(os.path.join(folder, filename)))
+                    if member is not None:
+                        names[filename] = member.name
+                disc_sets = group_disc_sets(locations, names)
+                listed = names if extracts_archives(config, system) else None
+
+            for disc_set in disc_sets.values():
+                title = disc_set["title"]
+                if len(disc_set["discs"]) < 2:
+                    if (disc_set["total"] or 1) > 1:
+                        stats.detail(f"Only one disc of {title} found; no M3U made.", "skip", title=title)
+                    continue
+                if disc_set["total"] and len(disc_set["discs"]) < disc_set["total"]:
+                    print(f"⚠ {title}: {len(disc_set['discs'])} of {disc_set['total']} discs found.")
+                result["games"] += 1
+                dest = os.path.join(disc_root, title) if per_game else disc_root
+                with stats.phase("move"):
+                    journal.makedirs(disc_root, system)
+                    journal.makedirs(dest, system)
+                    for files in disc_set["discs"].values():
+                        for filename in files:
+                            if locations[filename] == dest:
+                                continue
+                            src_path = os.path.join(locations[filename], filename)
+                            dst_path = os.path.join(dest, filename)
+                            seq = journal.begin("move", src_path, dst_path, system)
+                            try:
+                                rename_or_move(src_path, dst_path)
+                            except OSError as e:
+                                print(f"❌ Error moving {filename}: {e}")
+                                continue
+                            journal.commit(seq)
+                            result["moved"] += 1
+                            stats.count("moved")
+                            stats.detail(f"Moved {filename} to {dest}", "move", src=src_path, dst=dst_path)
+
+                prefix = m3u_path.replace(M3U_TITLE_PLACEHOLDER, title).replace("\\", "/").rstrip("/")
+                content = "\n".join(playlist_entries(disc_set, prefix, listed)) + "\n"
+                playlist = os.path.join(system_path, f"{title}.m3u")
+                try:
+                    with open(playlist, "r", encoding="utf-8") as f:
+                        existing = f.read()
+                except OSError:
+                    existing = None
+                if existing == content:
+                    continue
+                seq = journal.begin("copy", None, playlist, system, replace=existing is not None)
+                with open(playlist, "w", encoding="utf-8", newline="\n") as f:
+                    f.write(content)
+                journal.commit(seq)
+                result["playlists"] += 1
+                stats.count("playlists")
+                stats.detail(f"Wrote {title}.m3u ({len(disc_set['discs'])} discs)", "m3u", file=playlist)
+            inventory.refresh(system)
+
+        journal.finish()
+    finally:
+        journal.close()
+    print(f"✅ {result['playlists']} M3U file(s) written for {result['games']} multi-disc game(s).")
+    pause(1)
+    return result
 
 # -----------------------------
 # Run Cover Art Matching
 # -----------------------------
-def run_process_games(target_system, effective_dir, selected_systems=None):
+@instrumented("match")
+def run_process_games(target_system, effective_dir, selected_systems=None, workers=None, link_mode=None,
+                      move_unmatched=None, optimize_covers=None):
     # Prompt the user to select systems if not provided.
     if selected_systems is None:
         common_systems = get_common_systems(effective_dir)
@@ -380,70 +3862,172 @@ def run_process_games(target_system, effective_dir, selected_systems=None):
             return
 
     print("Running cover art matching on the following systems:")
-    excluded_extensions = (".ips", ".bps", ".bin")
-    move_unmatched = input("Move unmatched games to 'unmatched cover art'? (y/n): ").strip().lower() == "y"
-    
-    for system in selected_systems:
-        system_path = os.path.join(effective_dir, system)
-        cover_art_folder = os.path.join(system_path, "cover art")
-        renamed_folder = os.path.join(system_path, "renamed cover art")
-        if not os.path.exists(renamed_folder):
-            os.makedirs(renamed_folder, exist_ok=True)
-            print(f"Created 'renamed cover art' folder for {system}")
-        if move_unmatched:
-            unmatched_folder = os.path.join(system_path, "unmatched cover art")
-            if not os.path.exists(unmatched_folder):
-                os.makedirs(unmatched_folder, exist_ok=True)
-                print(f"Created 'unmatched cover art' folder for {system}")
-        
-        # Get all files in the system folder (ignoring subdirectories)
-        all_files = [f for f in os.listdir(system_path) if os.path.isfile(os.path.join(system_path, f))]
-        # Define main ROM files (excluding unwanted extensions)
-        main_roms = [f for f in all_files if not f.lower().endswith(excluded_extensions)]
-        # Get PNG files from the cover art folder.
-        png_files = [f for f in os.listdir(cover_art_folder)
-                     if f.lower().endswith(".png") and os.path.isfile(os.path.join(cover_art_folder, f))]
-        
-        for rom in main_roms:
-            base_rom = os.path.splitext(rom)[0]
-            # Remove any parenthesized parts
-            base_rom_clean = remove_parentheses(base_rom).lower()
-
-            best_match = None
-            highest_ratio = 0.0
-            for png in png_files:
-                base_png = os.path.splitext(png)[0]
-                base_png_clean = remove_parentheses(base_png).lower()
-                ratio = difflib.SequenceMatcher(None, base_rom_clean, base_png_clean).ratio()
-                if ratio > highest_ratio:
-                    highest_ratio = ratio
-                    best_match = png
-
-            if highest_ratio >= 0.75:
-                new_name = f"{rom}.png"
-                src_path = os.path.join(cover_art_folder, best_match)
-                dst_path = os.path.join(renamed_folder, new_name)
-                shutil.copy(src_path, dst_path)
-                print(f"Matching {rom} -> {new_name} with similarity {highest_ratio:.2f}")
-            else:
-                print(f"No cover art match found for {rom} (highest similarity: {highest_ratio:.2f})")
-                if move_unmatched:
-                    unmatched_files = [f for f in all_files if remove_parentheses(os.path.splitext(f)[0]).lower() == base_rom_clean]
-                    for af in unmatched_files:
-                        src_path = os.path.join(system_path, af)
-                        dst_path = os.path.join(unmatched_folder, af)
-                        if os.path.exists(src_path):
-                            shutil.move(src_path, dst_path)
-                            print(f"Moved unmatched file {af} to 'unmatched cover art'")
-                        else:
-                            print(f"File {src_path} not found, skipping.")
+    inventory = get_inventory(effective_dir)
+    link_mode = link_mode or RENAMED_LINK_MODE
+    if move_unmatched is None:
+        move_unmatched = ask("Move unmatched games to 'unmatched cover art'? (y/n): ").strip().lower() == "y"
+    journal = Journal.start("match", target_system=target_system, effective_dir=effective_dir,
+                            selected_systems=list(selected_systems), workers=workers, link_mode=link_mode,
+                            move_unmatched=move_unmatched)
+    try:
+        result = {"systems": list(selected_systems), "matched": 0, "copied": 0, "unmatched": 0, "moved": 0}
 
+        # Score every selected system up front (optionally across worker processes);
+        # the copies and moves below stay in this process and run in order.
+        # ROMs already scored against an unchanged cover art folder reuse the cache.
+        listings = {}
+        jobs = {}
+        caches = {}
+        exact = {}
+        # Per system, the name each ROM still to be matched is scored under.
+        queries = {}
+        stats = current_stats()
+        dat_index = load_dat_index()
+        config = load_master_config()
+        with stats.phase("scan"):
+            for system in selected_systems:
+                system_path = os.path.join(effective_dir, system)
+                cover_art_folder = os.path.join(system_path, "cover art")
+                # Group the system folder's files (ignoring subdirectories) into ROM sets;
+                # the main ROM files are the ones that aren't companions.
+                rom_sets = inventory.rom_sets(system)
+                main_roms = rom_sets.mains
+                # Zipped games are scored by the name of the game inside.
+                members = archive_main_members(system_path, main_roms)
+                # Get PNG files from the cover art folder.
+                png_files = inventory.covers(system)
+                fingerprint = cover_art_fingerprint(cover_art_folder, png_files)
+                if dat_index is not None:
+                    fingerprint += f" dats:{hashlib.sha1(json.dumps(dat_index.fingerprint).encode()).hexdigest()}"
+                cache = load_match_cache(system_path)
+                reusable = cache["matches"] if cache.get("cover_fingerprint") == fingerprint else {}
+                listings[system] = (rom_sets, members, extracts_archives(config, system, target_system))
+                caches[system] = (fingerprint, cache["matches"], reusable)
+                jobs[system] = ([rom for rom in main_roms if rom not in reusable], png_files)
+        # With DATs, ROMs are named by their contents first; only the rest are fuzzy matched,
+        # under their DAT name when the DAT knows them. Only the main ROMs still to be matched
+        # are hashed (hash_system times its own "hash" phase).
+        for system in selected_systems:
+            todo, png_files = jobs[system]
+            members = listings[system][1]
+            names = queries[system] = {rom: members[rom].name if rom in members else rom for rom in todo}
+            if dat_index is not None and todo:
+                # A zip's directory already has the CRC32 and size of the game inside.
+                hashes = {rom: {"crc32": f"{member.crc:08x}", "size": member.size}
+                          for rom, member in members.items() if member.crc is not None}
+                unread = [rom for rom in todo if rom not in hashes and not is_archive(rom)]
+                if unread:
+                    hashes.update(hash_system(effective_dir, system, names=unread)[0])
+                exact[system], titles = exact_dat_matches(todo, hashes, dat_index, png_files)
+                # The extension keeps clean_title() from cutting a DAT name at a dot ("Vol. 2").
+                names.update((rom, title + os.path.splitext(names[rom])[1]) for rom, title in titles.items())
+                todo = [rom for rom in todo if rom not in exact[system]]
+            jobs[system] = (list(dict.fromkeys(names[rom] for rom in todo)), png_files)
+        with stats.phase("score"):
+            scored = match_systems(jobs, workers)
+        stats.count("scored", sum(len(roms) for roms, _ in jobs.values()))
 
-    time.sleep(1)
+        for system in selected_systems:
+            system_path = os.path.join(effective_dir, system)
+            cover_art_folder = os.path.join(system_path, "cover art")
+            renamed_folder = os.path.join(system_path, "renamed cover art")
+            if journal.makedirs(renamed_folder, system):
+                print(f"Created 'renamed cover art' folder for {system}")
+            if move_unmatched:
+                unmatched_folder = os.path.join(system_path, "unmatched cover art")
+                if journal.makedirs(unmatched_folder, system):
+                    print(f"Created 'unmatched cover art' folder for {system}")
+            rom_sets, members, extract = listings[system]
+            main_roms = rom_sets.mains
+            moved_titles = set()
+            fingerprint, previous, reusable = caches[system]
+            optimized = load_cover_cache(system_path)
+            by_name = {name: (best, ratio) for name, best, ratio in scored[system]}
+            fresh = dict(exact.get(system, {}))
+            # Exact DAT matches are cached with a "dat" marker so they stay out of the similarity chart.
+            dat_matched = set(fresh) | {rom for rom, entry in reusable.items() if entry[2:] == ["dat"]}
+            names = queries[system]
+            fresh.update((rom, by_name[names[rom]]) for rom in main_roms if rom not in fresh and rom not in reusable)
+            matches = [(rom,) + (fresh[rom] if rom in fresh else tuple(reusable[rom][:2])) for rom in main_roms]
+            cache_entries = {}
+            fallback_warned = False
+
+            for done, (rom, best_match, highest_ratio) in enumerate(matches, 1):
+                if rom in dat_matched:
+                    stats.count("dat matches")
+                else:
+                    stats.ratio(highest_ratio)
+                stats.progress(done, len(matches), system)
+
+                if highest_ratio >= MATCH_THRESHOLD:
+                    # Named after the file the drive will have: the game inside when archives get extracted.
+                    new_name = f"{members[rom].name if extract and rom in members else rom}.png"
+                    src_path = os.path.join(cover_art_folder, best_match)
+                    dst_path = os.path.join(renamed_folder, new_name)
+                    cache_entries[rom] = [best_match, highest_ratio] + (["dat"] if rom in dat_matched else [])
+                    result["matched"] += 1
+                    same_source = previous.get(rom, [None])[0] == best_match
+                    if renamed_cover_is_current(src_path, dst_path, same_source) or (
+                            same_source and optimized_cover_is_current(optimized.get(new_name), src_path, dst_path)):
+                        stats.detail(f"Matching {rom} -> {new_name} with similarity {highest_ratio:.2f} (up to date)",
+                                     "match", rom=rom, cover=best_match, ratio=highest_ratio, current=True)
+                        continue
+                    with stats.phase("copy"):
+                        seq = journal.begin("copy", src_path, dst_path, system)
+                        used_mode = place_renamed_cover(src_path, dst_path, link_mode)
+                        journal.commit(seq)
+                    result["copied"] += 1
+                    stats.count("copied")
+                    if used_mode != link_mode and not fallback_warned:
+                        stats.end_progress()
+                        print(f"⚠ {link_mode} is not supported for {system}; copying cover art instead.")
+                        fallback_warned = True
+                    stats.detail(f"Matching {rom} -> {new_name} with similarity {highest_ratio:.2f}",
+                                 "match", rom=rom, cover=best_match, ratio=highest_ratio)
+                else:
+                    stats.detail(f"No cover art match found for {rom} (highest similarity: {highest_ratio:.2f})",
+                                 "unmatched", rom=rom, cover=best_match, ratio=highest_ratio)
+                    result["unmatched"] += 1
+                    if move_unmatched:
+                        # Every file with this title (other regions, companions) goes along, once.
+                        title = clean_title(rom)
+                        unmatched_files = [] if title in moved_titles else rom_sets.title_files(rom)
+                        moved_titles.add(title)
+                        for af in unmatched_files:
+                            src_path = os.path.join(system_path, af)
+                            dst_path = os.path.join(unmatched_folder, af)
+                            if os.path.exists(src_path):
+                                with stats.phase("move"):
+                                    seq = journal.begin("move", src_path, dst_path, system)
+                                    shutil.move(src_path, dst_path)
+                                    journal.commit(seq)
+                                result["moved"] += 1
+                                stats.count("moved")
+                                stats.detail(f"Moved unmatched file {af} to 'unmatched cover art'", "move",
+                                             src=src_path, dst=dst_path)
+                            else:
+                                stats.detail(f"File {src_path} not found, skipping.", "skip", file=src_path)
+                    else:
+                        cache_entries[rom] = [best_match, highest_ratio]
+
+            save_match_cache(system_path, fingerprint, cache_entries)
+            inventory.refresh(system)
+
+        stats.count("matched", result["matched"])
+        stats.count("unmatched", result["unmatched"])
+        journal.finish()
+    finally:
+        journal.close()
+    if COVER_OPTIMIZE if optimize_covers is None else optimize_covers:
+        covers = run_optimize_cover_art(target_system, effective_dir, list(selected_systems), workers)
+        result["optimized"] = covers["optimized"] if covers else 0
+    pause(1)
+    return result
 
 # -----------------------------
 # Restore Unmatched Games
 # -----------------------------
+@instrumented("restore")
 def restore_unmatched_games(effective_dir, selected_systems=None):
     print("\nRestoring unmatched games and cleaning up renamed cover art...")
 
@@ -455,71 +4039,74 @@ def restore_unmatched_games(effective_dir, selected_systems=None):
             print("Cancelling restore process...")
             return
 
+    # Step 2: Reverse what the journaled matching runs did (moves back, copies removed)
+    stats = current_stats()
+    with stats.phase("move"):
+        undone = undo_journaled("match", effective_dir, set(selected_systems))
+
     for system in selected_systems:
         system_path = os.path.join(effective_dir, system)
         unmatched_folder = os.path.join(system_path, "unmatched cover art")
         renamed_folder = os.path.join(system_path, "renamed cover art")
 
-        # Step 2: Move files back from unmatched cover art
+        # Step 3: Move back anything left in unmatched cover art (ie. from runs before journaling)
         if os.path.exists(unmatched_folder):
             for file in os.listdir(unmatched_folder):
                 src_path = os.path.join(unmatched_folder, file)
                 dest_path = os.path.join(system_path, file)
                 try:
-                    shutil.move(src_path, dest_path)
-                    print(f"✔ Moved {file} back to {system_path}")
+                    with stats.phase("move"):
+                        shutil.move(src_path, dest_path)
+                    stats.count("moved")
+                    stats.detail(f"✔ Moved {file} back to {system_path}", "move", src=src_path, dst=dest_path)
                 except Exception as e:
                     print(f"❌ Error moving {file}: {e}")
 
-            # Step 3: Delete the now-empty unmatched folder
+            # Delete the now-empty unmatched folder
             try:
                 os.rmdir(unmatched_folder)
                 print(f"🗑 Deleted empty 'unmatched cover art' folder for {system}")
             except OSError:
                 print(f"⚠ Could not delete 'unmatched cover art' for {system} (not empty).")
 
-        # Step 4: Delete renamed cover art folder
+        # Step 4: Delete renamed cover art folder (and the match cache that describes it)
+        try:
+            clear_match_cache(system_path)
+        except OSError as e:
+            print(f"❌ Error deleting match cache for {system}: {e}")
+        # rmtree only unlinks entries: hardlinks, reflinks and symlinks made by
+        # place_renamed_cover() never take the originals in 'cover art' with them.
         if os.path.exists(renamed_folder):
             try:
-                shutil.rmtree(renamed_folder)  # Deletes the folder and all its contents
+                with stats.phase("delete"):
+                    shutil.rmtree(renamed_folder)  # Deletes the folder and all its contents
                 print(f"🗑 Deleted 'renamed cover art' folder for {system}")
             except Exception as e:
                 print(f"❌ Error deleting 'renamed cover art' for {system}: {e}")
 
+    inventory = get_inventory(effective_dir)
+    for system in selected_systems:
+        inventory.refresh(system)
     print("\n✅ Restore process complete!")
-    time.sleep(1)
+    pause(1)
+    return {"systems": list(selected_systems), "undone": undone}
 
 
 # -----------------------------
 # Run Delete Drive Content
 # -----------------------------
-def run_delete_drive_content(target_system):
+@instrumented("delete")
+def run_delete_drive_content(target_system, selected_systems=None, selected_drive=None, confirm=None, wait=None):
     """
     Deletes content on the selected drive based on the paths in master.txt.
     Only shows consoles that have files in both the 'games' and 'renamed cover art' locations.
     """
 
     # Step 1: Drive Selection
-    available_drives = [f"{d}:\\" for d in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" if os.path.exists(f"{d}:\\")]
-    if not available_drives:
-        print("No available drives found. Exiting Delete Drive Content...")
-        return
-    print("\nAvailable drives:")
-    for idx, drive in enumerate(available_drives, start=1):
-        print(f"{idx}. {drive}")
-    drive_choice = input("Enter the number corresponding to the drive to delete content from (or 0 to cancel): ").strip()
-    if drive_choice == "0":
-        print("Cancelling Delete Drive Content...")
-        return
-    try:
-        drive_choice = int(drive_choice)
-    except ValueError:
-        print("Invalid drive selection.")
-        return
-    if drive_choice < 1 or drive_choice > len(available_drives):
-        print("Invalid drive selection.")
-        return
-    selected_drive = available_drives[drive_choice - 1]
+    if selected_drive is None:
+        selected_drive = select_drive("delete content from", "Delete Drive Content")
+        if selected_drive is None:
+            return
 
     # Step 2: Parse Master.txt for destination mappings
     mapping = parse_master_drive(selected_drive)
@@ -545,105 +4132,549 @@ def run_delete_drive_content(target_system):
     valid_systems.append("All Systems") if len(valid_systems) > 1 else None
 
     # Step 4: Select systems to delete from
-    selected_systems = get_multiple_selections(valid_systems, "\nSelect system(s) to delete content from:")
-    
     if selected_systems is None:
-        print("Deletion cancelled.")
-        return
-    
+        selected_systems = get_multiple_selections(valid_systems, "\nSelect system(s) to delete content from:")
+
+        if selected_systems is None:
+            print("Deletion cancelled.")
+            return
+
     if "All Systems" in selected_systems:
-        selected_systems = valid_systems[:-1]  # Remove "All Systems" and select all actual systems
+        selected_systems = [system for system in valid_systems if system != "All Systems"]
 
     # Step 5: Confirm Deletion
-    confirm_delete = input("⚠ WARNING: Are you sure you want to delete existing files? This action is irreversible! (y/n): ").strip().lower()
-    if confirm_delete != "y":
+    if confirm is None:
+        confirm = ask("⚠ WARNING: Are you sure you want to delete existing files? This action is irreversible! (y/n): ").strip().lower() == "y"
+    if not confirm:
         print("Deletion cancelled.")
         return
+    journal = Journal.start("delete", target_system=target_system, selected_systems=list(selected_systems),
+                            selected_drive=selected_drive, confirm=True)
+    try:
+        result = {"systems": list(selected_systems), "drive": selected_drive, "deleted": 0, "errors": 0,
+                  "unmapped": []}
+        deleter = get_background_deleter()
+        trash_root = os.path.join(selected_drive, TRASH_DIR_NAME)
+        if wait is None:
+            wait = not INTERACTIVE
 
-    def delete_files(dest):
-        """ Delete all contents in the specified destination path. """
-        if os.path.exists(dest):
-            for file_or_folder in os.listdir(dest):
-                full_path = os.path.join(dest, file_or_folder)
-                try:
-                    if os.path.isfile(full_path) or os.path.islink(full_path):
-                        os.remove(full_path)
-                        print(f"🗑 Deleted file: {full_path}")
-                    elif os.path.isdir(full_path):
-                        shutil.rmtree(full_path)
-                        print(f"🗑 Deleted folder: {full_path}")
-                except Exception as e:
-                    print(f"⚠ Error deleting {full_path}: {e}")
+        stats = current_stats()
+
+        def delete_files(dest, system):
+            """ Empty the destination path: rename it to the trash, the deleter does the rest. """
+            seq = journal.begin("delete", dest, None, system)
+            try:
+                with stats.phase("delete"):
+                    trash, count, stuck = move_to_trash(dest, trash_root)
+            except OSError as e:
+                result["errors"] += 1
+                print(f"⚠ Error deleting {dest}: {e}")
+                return
+            journal.commit(seq)
+            if trash is not None:
+                deleter.submit_trash(trash)
+            for path in stuck:
+                deleter.submit(path)
+            result["deleted"] += count
+            stats.count("emptied", count)
+            print(f"🗑 Emptied {dest} ({count} item(s))")
 
-    # Step 6: Process each selected system and delete files
-    print(f"\n🚀 Deleting content on drive {selected_drive} for selected systems...")
+        # Step 6: Process each selected system and delete files
+        print(f"\n🚀 Deleting content on drive {selected_drive} for selected systems...")
+        leftovers = deleter.submit_leftovers(trash_root)
+        if leftovers:
+            print(f"🧹 Also removing {leftovers} item(s) left in the trash by an earlier run.")
 
-    for system in selected_systems:
-        dest_mapping = mapping.get(system, {})
+        for system in selected_systems:
+            dest_mapping = mapping.get(system, {})
         
-        games_path = dest_mapping.get(f"{prefix} games", None)
-        cover_art_path = dest_mapping.get(f"{prefix} renamed cover art", None)
+            games_path = dest_mapping.get(f"{prefix} games", None)
+            cover_art_path = dest_mapping.get(f"{prefix} renamed cover art", None)
+
+            if games_path:
+                print(f"🧹 Deleting files in: {games_path}...")
+                delete_files(games_path, system)
+
+            if cover_art_path:
+                print(f"🧹 Deleting files in: {cover_art_path}...")
+                delete_files(cover_art_path, system)
+
+            if not games_path and not cover_art_path:
+                print(f"No destination mapping found for system '{system}' in Master.txt.")
+                result["unmapped"].append(system)
+
+        journal.finish()
+    finally:
+        journal.close()
+    if wait:
+        with stats.phase("background delete"):
+            deleter.wait()
+        deleted, failed, elapsed = deleter.take_summary()
+        result["deleted"] = deleted
+        result["errors"] += len(failed)
+        for path, error in failed:
+            print(f"⚠ Error deleting {path}: {error}")
+        print(f"✅ Drive cleanup complete: {deleted} item(s) removed in {elapsed:.1f}s.")
+    else:
+        print("✅ Drive cleanup started; files are being removed in the background.")
+    return result
+
+# -----------------------------
+# Find Duplicate ROMs
+# -----------------------------
+@instrumented("duplicates")
+def report_duplicate_roms(effective_dir, selected_systems=None, threads=None):
+    """
+    Hashes every game in the selected systems (region folders included) and
+    lists files with identical contents, so the same ROM isn't copied twice.
+    """
+    inventory = get_inventory(effective_dir)
+    expected = get_expected_systems()
+    systems = sorted(system for system in inventory.systems() if system in expected)
+    if not systems:
+        print("No system directories found in ROMS.")
+        return
+    if selected_systems is None:
+        if len(systems) > 1:
+            systems.append("All Systems")
+        selected_systems = get_multiple_selections(systems, "\nSelect system(s) to check for duplicates:")
+        if selected_systems is None:
+            print("Cancelling duplicate check...")
+            return
+    if "All Systems" in selected_systems:
+        selected_systems = [system for system in systems if system != "All Systems"]
+
+    print("Hashing games on the following systems:")
+    hashed = {}
+    total_hashed = 0
+    for system in selected_systems:
+        print(f"  - {system}")
+        hashed[system], count = hash_system(effective_dir, system, threads)
+        total_hashed += count
+    duplicates = find_duplicate_roms(hashed)
+    wasted = sum(group["size"] * (len(group["files"]) - 1) for group in duplicates)
+
+    if not duplicates:
+        print("\n✅ No duplicate games found.")
+    else:
+        print(f"\n🔁 {len(duplicates)} game(s) are stored more than once ({format_bytes(wasted)} of copies):")
+        for group in duplicates:
+            print(f"  {group['crc32']} {format_bytes(group['size'])}")
+            for path in group["files"]:
+                print(f"     {path}")
+    pause(1)
+    return {"systems": list(selected_systems), "files": sum(len(files) for files in hashed.values()),
+            "hashed": total_hashed, "duplicates": duplicates, "wasted_bytes": wasted}
+
+# -----------------------------
+# Match, Sort and Copy Pipeline
+# -----------------------------
+# Systems that may wait between two stages; a stage that gets this far ahead blocks.
+PIPELINE_QUEUE_SIZE = 2
+
+@instrumented("pipeline")
+def run_pipeline(target_system, effective_dir, selected_systems=None, selected_drive=None, sort=None,
+                 move_unmatched=None, workers=None, threads=None, sync=None, prune=None, verify=None):
+    """
+    Optionally sorts, then matches and copies to the drive in one go. Sorting
+    comes first so games it moves into region folders don't end up with
+    covers on the drive but no game. Each stage has
+    its own thread and hands finished systems to the next through a bounded
+    queue, so the first system is copying while the next is still matching
+    and the whole run takes about as long as its slowest stage. Every stage
+    runs the normal operation (with its own journal) on one system at a time.
+    """
+    # Everything is asked up front; the stage threads never prompt.
+    if selected_systems is None:
+        common_systems = get_common_systems(effective_dir)
+        selected_systems = get_multiple_selections(common_systems, "\nSelect system(s) to match and copy:")
+        if selected_systems is None:
+            print("Cancelling Match and Copy...")
+            return
+    if "All Systems" in selected_systems:
+        selected_systems = [system for system in get_common_systems(effective_dir) if system != "All Systems"]
+    if not selected_systems:
+        print("No systems with both games and cover art found in ROMS.")
+        return
+    if selected_drive is None:
+        selected_drive = select_drive("copy to", "Match and Copy")
+        if selected_drive is None:
+            return
+    if sort is None:
+        sort = ask("Sort files into region folders before matching? (y/n): ").strip().lower() == "y"
+    if move_unmatched is None:
+        move_unmatched = ask("Move unmatched games to 'unmatched cover art'? (y/n): ").strip().lower() == "y"
+    if sync is None:
+        sync = ask("Sync mode (copy new and changed files using the drive manifest)? (y/n): ").strip().lower() == "y"
+    if prune is None:
+        prune = sync and ask("Delete files from the drive that are no longer in your ROMS folder? (y/n): "
+                             ).strip().lower() == "y"
+    if verify is None:
+        verify = choose_verify_mode()
+
+    stages = []
+    if sort:
+        stages.append(("sort", lambda system: sort_files(effective_dir, [system])))
+    stages.append(("match", lambda system: run_process_games(target_system, effective_dir, [system], workers=workers,
+                                                             move_unmatched=move_unmatched)))
+    stages.append(("copy", lambda system: run_copy_to_drive(target_system, effective_dir, [system], threads=threads,
+                                                            sync=sync, prune=prune, selected_drive=selected_drive,
+                                                            fit=True, verify=verify)))
+
+    stats = current_stats()
+    results = {system: {} for system in selected_systems}
+    failed = {}
+    busy = {name: 0.0 for name, _ in stages}
+    queues = [queue.Queue(maxsize=PIPELINE_QUEUE_SIZE) for _ in stages[1:]] + [None]
+    source = queue.Queue()
+    for system in selected_systems:
+        source.put(system)
+    source.put(None)
+
+    def stage_worker(name, func, inbox, outbox):
+        while True:
+            system = inbox.get()
+            if system is None:
+                break
+            start = time.perf_counter()
+            try:
+                results[system][name] = func(system)
+            except Exception as e:
+                # A failed system goes no further; the others carry on.
+                failed[system] = f"{name}: {type(e).__name__}: {e}"
+                stats.end_progress()
+                print(f"❌ {name} failed for {system}: {e}")
+                continue
+            finally:
+                busy[name] += time.perf_counter() - start
+            stats.detail(f"{name} finished for {system}", "stage", stage=name, system=system)
+            if outbox is not None:
+                outbox.put(system)  # waits while the next stage is PIPELINE_QUEUE_SIZE systems behind
+        if outbox is not None:
+            outbox.put(None)
 
-        if games_path:
-            print(f"🧹 Deleting files in: {games_path}...")
-            delete_files(games_path)
+    # Matching (and optimizing covers) starts worker processes from a stage thread;
+    # the forkserver they come from has to be started while this is the only thread.
+    if forkserver is not None and "forkserver" in multiprocessing.get_all_start_methods() and (
+            resolve_worker_count(MATCH_WORKERS if workers is None else workers) > 1 or COVER_OPTIMIZE):
+        forkserver.ensure_running()
 
-        if cover_art_path:
-            print(f"🧹 Deleting files in: {cover_art_path}...")
-            delete_files(cover_art_path)
+    print(f"Matching and copying {len(selected_systems)} system(s) to {selected_drive}: "
+          + " → ".join(name for name, _ in stages))
+    start = time.perf_counter()
+    inboxes = [source] + queues[:-1]
+    stage_threads = [threading.Thread(target=stage_worker, args=(name, func, inbox, outbox), daemon=True)
+                     for (name, func), inbox, outbox in zip(stages, inboxes, queues)]
+    for thread in stage_threads:
+        thread.start()
+    for thread in stage_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
 
-    print("✅ Drive cleanup complete.")
+    print(f"\nPipeline took {elapsed:.1f}s; time spent in each stage: "
+          + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in busy.items()))
+    for system, error in failed.items():
+        print(f"⚠ {system} stopped at {error}")
+    print("✅ Match and Copy complete.")
+    pause(1)
+    copies = [stage.get("copy") or {} for stage in results.values()]
+    return {"systems": list(selected_systems), "drive": selected_drive,
+            "matched": sum((stage.get("match") or {}).get("matched", 0) for stage in results.values()),
+            "files": sum(copy.get("files", 0) for copy in copies),
+            "bytes": sum(copy.get("bytes", 0) for copy in copies),
+            "stage_seconds": {name: round(seconds, 3) for name, seconds in busy.items()},
+            "seconds": round(elapsed, 3), "failed": failed,
+            "unmapped": [system for copy in copies for system in copy.get("unmapped", ())],
+            "errors": len(failed) + sum(copy.get("errors", 0) for copy in copies)}
 
 # -----------------------------
 # Parse Master Function
 # -----------------------------
 def parse_master_drive(selected_drive):
-    mapping = {}
-    if not os.path.exists(MASTER_CONFIG):
-        return mapping
-    current_aliases = []
-    with open(MASTER_CONFIG, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith("[") and line.endswith("]"):
-                header = line[1:-1].strip()
-                if header.lower() == "working folder":
-                    current_aliases = []
-                    continue
-                current_aliases = [alias.strip() for alias in header.split("|")]
-                mapping_for_alias = {}
-                for alias in current_aliases:
-                    mapping[alias] = mapping_for_alias
-            elif current_aliases and line.startswith("-"):
-                parts = line[1:].split("=", 1)
-                if len(parts) == 2:
-                    key = parts[0].strip()
-                    value = parts[1].strip()
-                    if selected_drive is None:
-                        selected_drive = ""
-                    value = value.replace("drive:", selected_drive)
-                    for alias in current_aliases:
-                        mapping[alias][key] = value
-    return mapping
+    """
+    Returns alias -> {key: path} for the selected drive. This is a cached view
+    of load_master_config(), so calling it per drive does not reparse the file.
+    """
+    return load_master_config().drive_view(selected_drive)
+
+# Operations an interrupted journal can be resumed with (keyword arguments come from the journal).
+JOURNAL_RUNNERS = {
+    "match": run_process_games,
+    "m3u": run_multi_disc_games,
+    "sort": sort_files,
+    "copy": run_copy_to_drive,
+    "delete": run_delete_drive_content,
+}
+
+# -----------------------------
+# Command Line (Batch Mode)
+# -----------------------------
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NOTHING_TO_DO = 3
+
+def build_arg_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--target", default="wii", help="target prefix from Master.txt (default: wii)")
+    common.add_argument("--working-folder", help="ROMS folder to use instead of the [Working Folder] entry")
+    common.add_argument("--quiet", action="store_true", help="drop the per-file messages (normally sent to stderr)")
+    common.add_argument("--recover", choices=("resume", "rollback"),
+                        help="first resume or roll back any interrupted operation")
+    common.add_argument("--verbose", action="store_true", help="print a line for every file")
+    common.add_argument("--stats", action="store_true", help="add phase times and the match chart to the summary")
+    common.add_argument("--trace", metavar="PATH", help="write per-file detail to PATH (.jsonl for JSON lines)")
+    common.add_argument("--profile", metavar="DIR", help="run under cProfile and save the stats in DIR")
+
+    parser = argparse.ArgumentParser(
+        prog="Vod's Multi Tool",
+        description="Batch mode: runs one operation, prints a JSON line with the result and timing to stdout. "
+                    "Run without arguments for the menus.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def systems_arg(p):
+        p.add_argument("--systems", default="all", help="comma-separated system folders, or 'all' (default)")
+
+    p = sub.add_parser("match", parents=[common], help="match cover art to games")
+    systems_arg(p)
+    p.add_argument("--move-unmatched", action="store_true", help="move unmatched games to 'unmatched cover art'")
+    p.add_argument("--workers", type=int, help="matching processes (0 = every core)")
+    p.add_argument("--link-mode", choices=LINK_MODES, help="how renamed cover art is created")
+    p.add_argument("--engine", choices=("index", "brute"), help="matching engine")
+    p.add_argument("--optimize-covers", action="store_true", help="resize and recompress the renamed cover art")
+
+    p = sub.add_parser("restore", parents=[common], help="undo matching of cover art")
+    systems_arg(p)
+
+    p = sub.add_parser("copy", parents=[common], help="copy files to a drive")
+    systems_arg(p)
+    p.add_argument("--drive", required=True, help="drive root that replaces 'drive:' in Master.txt (ie. E:)")
+    p.add_argument("--threads", type=int, help="copy threads (1 = serial)")
+    p.add_argument("--sync", action="store_true", help="copy new and changed files using the drive manifest")
+    p.add_argument("--prune", action="store_true", help="with --sync, delete files no longer in ROMS")
+    p.add_argument("--fit", action="store_true", help="if the drive is too small, copy the systems that fit")
+    p.add_argument("--verify", choices=VERIFY_MODES, default=COPY_VERIFY, help="check the copies afterwards")
+
+    p = sub.add_parser("pipeline", parents=[common], help="match, optionally sort, and copy to a drive in one go")
+    systems_arg(p)
+    p.add_argument("--drive", required=True, help="drive root that replaces 'drive:' in Master.txt (ie. E:)")
+    p.add_argument("--sort", action="store_true", help="sort into region folders before copying")
+    p.add_argument("--move-unmatched", action="store_true", help="move unmatched games to 'unmatched cover art'")
+    p.add_argument("--workers", type=int, help="matching processes (0 = every core)")
+    p.add_argument("--threads", type=int, help="copy threads (1 = serial)")
+    p.add_argument("--sync", action="store_true", help="copy new and changed files using the drive manifest")
+    p.add_argument("--prune", action="store_true", help="with --sync, delete files no longer in ROMS")
+    p.add_argument("--verify", choices=VERIFY_MODES, default=COPY_VERIFY, help="check the copies afterwards")
+
+    p = sub.add_parser("delete", parents=[common], help="delete content from a drive")
+    systems_arg(p)
+    p.add_argument("--drive", required=True, help="drive root that replaces 'drive:' in Master.txt (ie. E:)")
+    p.add_argument("--yes", action="store_true", help="confirm the deletion (required)")
+
+    p = sub.add_parser("ftp", parents=[common], help="upload files to a console's FTP server")
+    systems_arg(p)
+    p.add_argument("--host", required=True, help="FTP server address (ie. 192.168.1.20)")
+    p.add_argument("--port", type=int, help=f"FTP port (default {FTP_PORT})")
+    p.add_argument("--user", help=f"login (default {FTP_USER})")
+    p.add_argument("--password", help="password (default empty)")
+    p.add_argument("--connections", type=int, help=f"parallel uploads (default {FTP_CONNECTIONS})")
+
+    p = sub.add_parser("duplicates", parents=[common], help="find games stored more than once (by content)")
+    systems_arg(p)
+    p.add_argument("--threads", type=int, help="hashing threads")
+
+    p = sub.add_parser("covers", parents=[common], help="resize and recompress renamed cover art")
+    systems_arg(p)
+    p.add_argument("--workers", type=int, help="resizing processes (0 = every core)")
+
+    p = sub.add_parser("m3u", parents=[common], help="create M3U files for multi-disc games")
+    systems_arg(p)
+
+    p = sub.add_parser("sort", parents=[common], help="sort files into region folders")
+    systems_arg(p)
+
+    p = sub.add_parser("unsort", parents=[common], help="undo the region sort")
+    systems_arg(p)
+
+    sub.add_parser("undo", parents=[common], help="undo the last operation")
+    return parser
+
+def normalize_drive(drive):
+    """Accepts "E", "E:" or "E:\\" for drive letters; anything else is used as given."""
+    if len(drive) == 1 and drive.isalpha():
+        drive += ":"
+    if len(drive) == 2 and drive[1] == ":":
+        drive += "\\"
+    return drive
+
+def resolve_cli_systems(value, available):
+    """Turns the --systems value into a list; raises ValueError for names that aren't available."""
+    if value.strip().lower() == "all":
+        return list(available)
+    systems = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in systems if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown or empty system(s): {', '.join(unknown)}")
+    return systems
+
+def configured_systems(effective_dir):
+    """System folders in ROMS that have a section in Master.txt."""
+    expected = get_expected_systems()
+    return sorted(system for system in get_inventory(effective_dir).systems() if system in expected)
+
+def systems_processed(result):
+    """
+    How many systems an operation worked on: its "systems" without the
+    "unmapped" ones it skipped. None for results that aren't per system.
+    """
+    systems = result.get("systems")
+    if systems is None or isinstance(systems, int):
+        return systems
+    unmapped = set(result.get("unmapped", ()))
+    return sum(1 for system in systems if system not in unmapped)
+
+def run_cli_command(args, effective_dir):
+    if args.command == "match":
+        if args.engine:
+            global MATCH_ENGINE
+            MATCH_ENGINE = args.engine
+        available = get_common_systems(effective_dir)[:-1]
+        systems = resolve_cli_systems(args.systems, available)
+        if not systems:
+            return None
+        return run_process_games(args.target, effective_dir, systems, workers=args.workers,
+                                 link_mode=args.link_mode, move_unmatched=args.move_unmatched,
+                                 optimize_covers=args.optimize_covers or None)
+    if args.command == "restore":
+        available = get_inventory(effective_dir).systems()
+        systems = resolve_cli_systems(args.systems, available)
+        return restore_unmatched_games(effective_dir, systems) if systems else None
+    if args.command == "copy":
+        systems = ["All Systems"] if args.systems.strip().lower() == "all" else resolve_cli_systems(
+            args.systems, configured_systems(effective_dir))
+        return run_copy_to_drive(args.target, effective_dir, systems, threads=args.threads, sync=args.sync,
+                                 prune=args.prune, selected_drive=normalize_drive(args.drive), fit=args.fit,
+                                 verify=args.verify)
+    if args.command == "pipeline":
+        available = get_common_systems(effective_dir)[:-1]
+        systems = resolve_cli_systems(args.systems, available)
+        if not systems:
+            return None
+        return run_pipeline(args.target, effective_dir, systems, selected_drive=normalize_drive(args.drive),
+                            sort=args.sort, move_unmatched=args.move_unmatched, workers=args.workers,
+                            threads=args.threads, sync=args.sync, prune=args.prune, verify=args.verify)
+    if args.command == "delete":
+        if not args.yes:
+            raise ValueError("delete needs --yes to confirm")
+        systems = ["All Systems"] if args.systems.strip().lower() == "all" else resolve_cli_systems(
+            args.systems, get_expected_systems())
+        return run_delete_drive_content(args.target, systems, selected_drive=normalize_drive(args.drive),
+                                        confirm=args.yes)
+    if args.command == "ftp":
+        systems = ["All Systems"] if args.systems.strip().lower() == "all" else resolve_cli_systems(
+            args.systems, configured_systems(effective_dir))
+        return run_ftp_transfer(args.target, effective_dir, systems, host=args.host, port=args.port, user=args.user,
+                                password=args.password, connections=args.connections)
+    if args.command == "duplicates":
+        available = sorted(system for system in get_inventory(effective_dir).systems()
+                           if system in get_expected_systems())
+        systems = resolve_cli_systems(args.systems, available)
+        return report_duplicate_roms(effective_dir, systems, threads=args.threads) if systems else None
+    if args.command == "covers":
+        inventory = get_inventory(effective_dir)
+        available = sorted(system for system in inventory.systems() if inventory.has_files(system, "renamed cover art"))
+        systems = resolve_cli_systems(args.systems, available)
+        return run_optimize_cover_art(args.target, effective_dir, systems, workers=args.workers) if systems else None
+    if args.command == "m3u":
+        available = sorted(system for system in get_inventory(effective_dir).systems()
+                           if has_multi_disc_entry(load_master_config(), system))
+        systems = resolve_cli_systems(args.systems, available)
+        return run_multi_disc_games(effective_dir, systems) if systems else None
+    if args.command == "sort":
+        systems = None if args.systems.strip().lower() == "all" else resolve_cli_systems(
+            args.systems, configured_systems(effective_dir))
+        return sort_files(effective_dir, systems)
+    if args.command == "unsort":
+        systems = None if args.systems.strip().lower() == "all" else resolve_cli_systems(
+            args.systems, configured_systems(effective_dir))
+        return unsort_files(effective_dir, systems)
+    if args.command == "undo":
+        return {"undone": undo_last_operation()}
+    raise ValueError(f"Unknown command {args.command}")
+
+def run_cli(argv):
+    """
+    Runs one batch command and writes a single JSON line to stdout:
+    {"command", "target", "status", "exit_code", "seconds", "result"[, "error"], "stats"}.
+    Human-readable messages go to stderr (or nowhere with --quiet).
+    """
+    global INTERACTIVE, VERBOSE, SHOW_STATS, TRACE_PATH, PROFILE_DIR
+    INTERACTIVE = False
+    args = build_arg_parser().parse_args(argv)
+    VERBOSE = VERBOSE or args.verbose
+    SHOW_STATS = SHOW_STATS or args.stats
+    TRACE_PATH = args.trace or TRACE_PATH
+    PROFILE_DIR = args.profile or PROFILE_DIR
+    out = sys.stdout
+    log = io.StringIO() if args.quiet else sys.stderr
+    record = {"command": args.command, "target": args.target}
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            effective_dir = args.working_folder or os.path.join(BASE_DIR, get_working_folder(args.target))
+            record["working_folder"] = effective_dir
+            if args.recover:
+                recover_interrupted_operations("r" if args.recover == "resume" else "b")
+            result = run_cli_command(args, effective_dir)
+        if result is None:
+            record["status"], code = "nothing to do", EXIT_NOTHING_TO_DO
+        elif result.get("errors"):
+            record["status"], code = "errors", EXIT_FAILED
+        elif systems_processed(result) == 0:
+            # No selected system had a destination in Master.txt.
+            record["status"], code = "nothing to do", EXIT_NOTHING_TO_DO
+        else:
+            record["status"], code = "ok", EXIT_OK
+        record["result"] = result
+    except (ValueError, NonInteractiveError) as e:
+        record["status"], record["error"], code = "usage", str(e), EXIT_USAGE
+    except Exception as e:
+        record["status"], record["error"], code = "failed", f"{type(e).__name__}: {e}", EXIT_FAILED
+    record["exit_code"] = code
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    stats = last_operation_stats()
+    if stats is not None:
+        record["stats"] = stats.as_dict()
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+    return code
 
 # -----------------------------
 # Main Menu
 # -----------------------------
 def main():
+    try:
+        load_master_config()
+    except MasterConfigError as e:
+        print(f"❌ {e}. Put Master.txt next to the tool and try again.")
+        return
+    recover_interrupted_operations()
     while True:
         print("\nWhich system are we making this for?")
         print("1. Raspberry Pi")
         print("2. Nintendo Wii")
         print("3. Microsoft XBOX")
-        target_choice = input("Enter your choice (0 will exit): ").strip()
+        target_choice = ask("Enter your choice (0 will exit): ").strip()
         target_map = {
             "1": "rpi",
             "2": "wii",
             "3": "xbox",
         }
         if target_choice == "0":
+            if _background_deleter is not None and _background_deleter.busy():
+                print("Waiting for the background delete to finish...")
+                _background_deleter.wait()
+            report_background_deletes()
             print("Exiting program...")
             return
         if target_choice not in target_map:
@@ -662,7 +4693,14 @@ def main():
                 print("4. Delete content from drive")
                 print("5. Sort files")
                 print("6. Unsort files")
-                op_choice = input("Enter your selection (or 0 to return): ").strip()
+                print("7. Undo last operation")
+                print("8. Find duplicate games")
+                print("9. Create M3U files for multi-disc games")
+                print("10. Upload files over FTP")
+                print("11. Optimize cover art")
+                print("12. Match and copy to drive in one go")
+                report_background_deletes()
+                op_choice = ask("Enter your selection (or 0 to return): ").strip()
 
                 if op_choice == "0":
                     break
@@ -678,13 +4716,27 @@ def main():
                     sort_files(effective_dir)
                 elif op_choice == "6":
                     unsort_files(effective_dir)
+                elif op_choice == "7":
+                    undo_last_operation()
+                elif op_choice == "8":
+                    report_duplicate_roms(effective_dir)
+                elif op_choice == "9":
+                    run_multi_disc_games(effective_dir)
+                elif op_choice == "10":
+                    run_ftp_transfer(target_system, effective_dir)
+                elif op_choice == "11":
+                    run_optimize_cover_art(target_system, effective_dir)
+                elif op_choice == "12":
+                    run_pipeline(target_system, effective_dir)
                 else:
                     print("Invalid selection. Try again.")
 
                 print("\nOperation Complete!! Returning to Operations Menu...")
-                time.sleep(2)
+                pause(2)
         else:
             pause_or_continue()
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     main()
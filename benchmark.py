@@ -0,0 +1,270 @@
+"""
+Benchmarks for Vod's Multi Tool.
+
+Builds fake ROM libraries in a temp folder (No-Intro style names with region
+and revision tags, .cue/.bin and .ips companions, cover art with near-miss
+names), times each operation against them and writes the timings to a JSON
+file. Pass an earlier results file with --compare to flag slowdowns.
+
+    python benchmark.py --sizes 1000,10000 --output bench.json
+    python benchmark.py --sizes 1000,10000 --compare bench.json
+"""
+import os
+import sys
+import io
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import importlib.util
+
+TOOL_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOL_PATH = os.path.join(TOOL_DIR, "Vod's Multi Tool.py")
+MASTER_PATH = os.path.join(TOOL_DIR, "Master.txt")
+
+OPERATIONS = ("sort", "unsort", "match", "match cached", "copy", "copy sync", "delete", "restore")
+SYSTEMS = ("SNES", "NES", "Mega Drive", "GBA", "Playstation")
+# A run this much slower than the compared one is reported as a regression.
+REGRESSION_FACTOR = 1.25
+# Runs faster than this are too noisy to compare.
+MIN_COMPARE_SECONDS = 0.25
+
+WORDS = ("super mario world zelda link past sonic hedgehog street fighter final fantasy kirby dream land "
+         "metroid castlevania contra donkey kong country golf tennis racing star fox pilotwings mega man "
+         "adventure island legend quest dragon warrior ninja gaiden tetris puzzle baseball soccer hockey "
+         "wrestling turtles battle tank pinball chess space harrier outrun rally kart party bomber").split()
+REGIONS = ("USA", "Europe", "Japan", "USA, Europe", "Germany", "France", "Spain", "Europe, Australia",
+           "E", "Japan, USA", "Brazil", "Asia")
+EXTENSIONS = {"Playstation": ".cue", "GBA": ".gba", "NES": ".nes", "SNES": ".sfc", "Mega Drive": ".md"}
+
+def load_tool():
+    spec = importlib.util.spec_from_file_location("vods_multi_tool", TOOL_PATH)
+    tool = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(tool)
+    return tool
+
+def tool_version():
+    """git describe of the tool when available, otherwise a hash of the script."""
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=TOOL_DIR,
+                             capture_output=True, text=True, timeout=10)
+        if out.returncode == 0 and out.stdout.strip():
+            return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        pass
+    with open(TOOL_PATH, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+# -----------------------------
+# Library Generator
+# -----------------------------
+def random_title(rng):
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+    if rng.random() < 0.25:
+        title += f" {rng.randint(2, 4)}"
+    if rng.random() < 0.2:
+        title += " - " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).title()
+    if rng.random() < 0.1:
+        title = "The " + title
+    return title
+
+def near_miss(rng, title):
+    """A cover name that a person would match to title but isn't spelled the same."""
+    roll = rng.random()
+    if roll < 0.25 and " - " in title:
+        return title.split(" - ")[0]
+    if roll < 0.45 and title.startswith("The "):
+        return title[4:] + ", The"
+    if roll < 0.6:
+        return title.replace(" - ", ": ")
+    if roll < 0.7:
+        return title.replace("2", "II").replace("3", "III")
+    if roll < 0.8:
+        return title.lower()
+    return title
+
+def rom_name(rng, title):
+    name = f"{title} ({rng.choice(REGIONS)})"
+    if rng.random() < 0.15:
+        name += f" (Rev {rng.choice('ABC12')})"
+    if rng.random() < 0.05:
+        name += " (Beta)"
+    return name
+
+def generate_library(root, files_per_system, systems=SYSTEMS[:2], seed=1):
+    """
+    Writes a library of roughly files_per_system game files (companions
+    included) per system into root. Returns the number of files written.
+    """
+    rng = random.Random(seed)
+    written = 0
+    for system in systems:
+        system_dir = os.path.join(root, system)
+        cover_dir = os.path.join(system_dir, "cover art")
+        os.makedirs(cover_dir, exist_ok=True)
+        ext = EXTENSIONS.get(system, ".bin")
+        names = set()
+        count = 0
+        while count < files_per_system:
+            title = random_title(rng)
+            name = rom_name(rng, title)
+            if name in names:
+                continue
+            names.add(name)
+            files = [name + ext]
+            if ext == ".cue":
+                files.append(name + ".bin")
+            if rng.random() < 0.08:
+                files.append(name + ".ips")
+            for filename in files:
+                with open(os.path.join(system_dir, filename), "wb") as f:
+                    f.write(rng.randbytes(rng.randint(256, 4096)))
+            count += len(files)
+            # Most games have a cover, some covers belong to games that aren't there.
+            if rng.random() < 0.85:
+                cover = near_miss(rng, title)
+                if rng.random() < 0.5:
+                    cover += f" ({rng.choice(REGIONS[:3])})"
+                with open(os.path.join(cover_dir, cover + ".png"), "wb") as f:
+                    f.write(b"\x89PNG" + rng.randbytes(64))
+                written += 1
+            if rng.random() < 0.1:
+                with open(os.path.join(cover_dir, random_title(rng) + ".png"), "wb") as f:
+                    f.write(b"\x89PNG" + rng.randbytes(64))
+                written += 1
+        written += count
+    return written
+
+# -----------------------------
+# Benchmark Runner
+# -----------------------------
+def time_operation(name, func):
+    """Runs func with its output swallowed; returns (seconds, result)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return time.perf_counter() - start, result
+
+def run_size(tool, files_per_system, systems, operations, workers=None, threads=None, seed=1, keep=False):
+    """Times every operation on a fresh library of the given size; returns a list of run records."""
+    work = tempfile.mkdtemp(prefix="multi tool bench ")
+    try:
+        roms = os.path.join(work, "ROMS")
+        drive = os.path.join(work, "drive") + os.sep
+        os.makedirs(drive)
+        start = time.perf_counter()
+        files = generate_library(roms, files_per_system, systems, seed)
+        generated = time.perf_counter() - start
+        print(f"Generated {files} files for {len(systems)} system(s) in {generated:.1f}s ({work})")
+
+        tool.JOURNAL_DIR = os.path.join(work, "journal")
+        selected = list(systems)
+        steps = {
+            "sort": lambda: tool.sort_files(roms),
+            "unsort": lambda: tool.unsort_files(roms),
+            "match": lambda: tool.run_process_games("wii", roms, selected, workers=workers, move_unmatched=True),
+            "match cached": lambda: tool.run_process_games("wii", roms, selected, workers=workers,
+                                                           move_unmatched=True),
+            "copy": lambda: tool.run_copy_to_drive("wii", roms, selected, threads=threads, sync=False,
+                                                   prune=False, selected_drive=drive),
+            "copy sync": lambda: tool.run_copy_to_drive("wii", roms, selected, threads=threads, sync=True,
+                                                        prune=False, selected_drive=drive),
+            "delete": lambda: tool.run_delete_drive_content("wii", selected, drive, confirm=True, wait=True),
+            "restore": lambda: tool.restore_unmatched_games(roms, selected),
+        }
+        runs = []
+        for name in OPERATIONS:
+            if name not in operations:
+                continue
+            seconds, result = time_operation(name, steps[name])
+            stats = tool.last_operation_stats()
+            runs.append({"files_per_system": files_per_system, "systems": len(systems), "op": name,
+                         "seconds": round(seconds, 4), "result": result,
+                         "phases": stats.as_dict()["phases"] if stats is not None else {}})
+            print(f"  {name:<13} {seconds:8.3f}s")
+        return runs
+    finally:
+        if keep:
+            print(f"Kept {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+def compare_results(runs, previous):
+    """Prints old vs new time per (size, op); returns the regressions found."""
+    old = {(run["files_per_system"], run["systems"], run["op"]): run["seconds"] for run in previous.get("runs", [])}
+    regressions = []
+    print(f"\nCompared with {previous.get('version', '?')}:")
+    for run in runs:
+        key = (run["files_per_system"], run["systems"], run["op"])
+        if key not in old:
+            continue
+        before, after = old[key], run["seconds"]
+        ratio = after / before if before > 0 else float("inf")
+        flag = ""
+        if ratio > REGRESSION_FACTOR and after >= MIN_COMPARE_SECONDS:
+            flag = "  ⚠ slower"
+            regressions.append({"files_per_system": key[0], "op": key[2], "before": before, "after": after})
+        print(f"  {key[0]:>6} files  {key[2]:<13} {before:8.3f}s → {after:8.3f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Time Vod's Multi Tool operations on generated libraries.")
+    parser.add_argument("--sizes", default="1000", help="comma-separated files per system (ie. 1000,10000,50000)")
+    parser.add_argument("--systems", type=int, default=2, help=f"number of systems (1-{len(SYSTEMS)})")
+    parser.add_argument("--ops", default="all", help="comma-separated operations: " + ", ".join(OPERATIONS))
+    parser.add_argument("--workers", type=int, help="matching processes (0 = every core)")
+    parser.add_argument("--threads", type=int, help="copy threads")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--keep", action="store_true", help="leave the generated libraries in place")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    systems = SYSTEMS[:max(1, min(args.systems, len(SYSTEMS)))]
+    operations = OPERATIONS if args.ops == "all" else tuple(op.strip() for op in args.ops.split(","))
+    unknown = [op for op in operations if op not in OPERATIONS]
+    if unknown:
+        print(f"Unknown operation(s): {', '.join(unknown)}")
+        return 2
+
+    tool = load_tool()
+    tool.INTERACTIVE = False
+    tool.MASTER_CONFIG = MASTER_PATH
+
+    runs = []
+    for size in sizes:
+        print(f"\n📏 {size} files per system")
+        runs.extend(run_size(tool, size, systems, operations, args.workers, args.threads, args.seed, args.keep))
+
+    results = {
+        "version": tool_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "runs": runs,
+    }
+    code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        results["compared_with"] = previous.get("version")
+        results["regressions"] = compare_results(runs, previous)
+        code = 1 if results["regressions"] else 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {args.output}")
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())